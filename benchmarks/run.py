@@ -0,0 +1,252 @@
+"""
+Offline end-to-end benchmark: ingest synthetic videos and answer queries with stub
+ASR, embedding and LLM backends, then write per-stage timings as JSON.
+
+    python -m benchmarks.run --lengths 60 300 --fps 0.5 1 --output bench.json
+    python -m benchmarks.run --lengths 60 300 --fps 0.5 1 --baseline bench.json
+"""
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
+
+from benchmarks.synthetic import make_video
+
+QUERIES = [
+    "What is shown on the screen?",
+    "When does the tone stop?",
+    '"segment 3 tone"',
+    "Which segments mention the glacier and the falcon?",
+    "What is shown on the screen?",
+]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its finished children, in MiB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+class StageTimer:
+    """
+    Wraps methods of pipeline objects and accumulates their wall time per stage.
+    Stages may overlap when `Config.concurrent_stages` is on, so they do not sum up
+    to the total.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, obj, method_name: str, stage: str = None):
+        stage = stage or method_name
+        method = getattr(obj, method_name)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        setattr(obj, method_name, timed)
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0, "latencies": []})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+            entry["latencies"].append(seconds)
+            entry["peak_rss_mb"] = peak_rss_mb()
+
+    def report(self) -> dict:
+        report = {}
+        for stage, entry in self.stages.items():
+            latencies = sorted(entry["latencies"])
+            report[stage] = {
+                "seconds": round(entry["seconds"], 4),
+                "calls": entry["calls"],
+                "p50_seconds": round(statistics.median(latencies), 4),
+                "max_seconds": round(latencies[-1], 4),
+                "peak_rss_mb": round(entry["peak_rss_mb"], 1),
+            }
+        return report
+
+
+def run_case(case: dict, work_dir: str, queries: list) -> dict:
+    """
+    Ingest, index and query one synthetic video. Runs in a fresh process so that peak
+    RSS and model state are per case.
+    """
+    from processors import Config, Retriever, VideoProcessor
+    from processors.processor import ConversationBot
+    from benchmarks.stubs import StubEmbedding, StubLLM, StubTranscriber
+
+    video_path = make_video(
+        os.path.join(work_dir, "videos", f"{case['length']}s-{case['width']}x{case['height']}-{case['source_fps']}.mp4"),
+        seconds=case["length"], width=case["width"], height=case["height"], fps=case["source_fps"]
+    )
+    case_dir = os.path.join(work_dir, "runs", case["name"])
+    os.makedirs(case_dir, exist_ok=True)
+    embed_model = StubEmbedding()
+    config = Config(
+        output_folder=case_dir,
+        video_fps=case["video_fps"],
+        cache_dir=None,
+        embedding_cache_dir=None,
+        lancedb_uri=os.path.join(case_dir, "lancedb"),
+        text_embed_model=embed_model,
+        image_embed_model=embed_model,
+        **case["config"]
+    )
+    video_processor = VideoProcessor(config=config, transcriber=StubTranscriber())
+    retriever = Retriever(config=config)
+    bot = ConversationBot(
+        config=config,
+        video_processor=video_processor,
+        retriever_processor=retriever,
+        database_path=case_dir,
+        llm=StubLLM(config=config)
+    )
+
+    timer = StageTimer()
+    timer.wrap(video_processor, "download_video", "download")
+    timer.wrap(video_processor, "_frames_stage", "frames")
+    timer.wrap(video_processor, "video_to_audio", "audio")
+    timer.wrap(video_processor, "audio_to_segments", "transcript")
+    timer.wrap(retriever, "precompute_image_embeddings", "frame_embedding")
+    timer.wrap(retriever, "insert_frames", "progressive_frames")
+    timer.wrap(retriever, "insert_segments", "progressive_transcript")
+    timer.wrap(retriever, "embed_nodes", "index_embedding")
+    timer.wrap(retriever, "retrieve", "retrieve")
+    timer.wrap(bot, "read_video", "ingest")
+    timer.wrap(bot, "index", "index")
+    timer.wrap(bot, "chat", "query")
+
+    started = time.perf_counter()
+    bot.read_video(url=video_path)
+    bot.index()
+    for query in queries:
+        bot.chat(user_message=query)
+    total = time.perf_counter() - started
+
+    stages = timer.report()
+    frames = len(video_processor.timestamps)
+    ingest_seconds = stages["ingest"]["seconds"] + stages["index"]["seconds"]
+    return {
+        **{key: value for key, value in case.items() if key != "config"},
+        "config": case["config"],
+        "frames": frames,
+        "segments": len(video_processor.segments),
+        "total_seconds": round(total, 4),
+        "stages": stages,
+        "throughput": {
+            "frames_per_second": round(frames / stages["frames"]["seconds"], 2) if "frames" in stages else None,
+            "video_seconds_per_second": round(case["length"] / ingest_seconds, 2),
+            "queries_per_second": round(len(queries) / stages["query"]["seconds"], 2) if queries else None,
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def build_matrix(args) -> list:
+    cases = []
+    width, height = (int(value) for value in args.resolution.split("x"))
+    for length in args.lengths:
+        for video_fps in args.fps:
+            cases.append({
+                "name": f"len{length}-fps{video_fps}",
+                "length": length,
+                "video_fps": video_fps,
+                "width": width,
+                "height": height,
+                "source_fps": args.source_fps,
+                "config": {"concurrent_stages": not args.sequential, "asr_workers": 1},
+            })
+    return cases
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """
+    Relative change of every stage's wall time against a baseline run, matched by
+    case name; positive means slower.
+    """
+    previous = {case["name"]: case for case in baseline["cases"]}
+    rows = []
+    for case in results["cases"]:
+        old = previous.get(case["name"])
+        if old is None:
+            continue
+        stages = dict(case["stages"], total={"seconds": case["total_seconds"]})
+        old_stages = dict(old["stages"], total={"seconds": old["total_seconds"]})
+        for stage, entry in stages.items():
+            if stage in old_stages and old_stages[stage]["seconds"]:
+                change = entry["seconds"] / old_stages[stage]["seconds"] - 1
+                rows.append({"case": case["name"], "stage": stage, "change": round(change, 4)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=float, nargs="+", default=[30, 120], help="Video lengths in seconds.")
+    parser.add_argument("--fps", type=float, nargs="+", default=[0.5, 1.0], help="`Config.video_fps` values.")
+    parser.add_argument("--resolution", default="640x360", help="Synthetic video size, WIDTHxHEIGHT.")
+    parser.add_argument("--source-fps", type=int, default=25, help="Frame rate of the synthetic videos.")
+    parser.add_argument("--queries", type=int, default=len(QUERIES), help="Number of queries per case.")
+    parser.add_argument("--sequential", action="store_true", help="Disable `Config.concurrent_stages`.")
+    parser.add_argument("--work-dir", default="benchmark_data", help="Where videos and indexes are written.")
+    parser.add_argument("--output", help="Write results as JSON to this file instead of stdout.")
+    parser.add_argument("--baseline", help="Earlier results file to compare stage times against.")
+    args = parser.parse_args()
+
+    queries = [QUERIES[idx % len(QUERIES)] for idx in range(args.queries)]
+    results = {"environment": environment(), "cases": []}
+    context = multiprocessing.get_context("spawn")
+    for case in build_matrix(args):
+        logger.info(f"Running benchmark case {case['name']}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results["cases"].append(pool.submit(run_case, case, os.path.abspath(args.work_dir), queries).result())
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            results["comparison"] = compare(results, json.load(file))
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(payload)
+        logger.info(f"Results written to {args.output}")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import time
+import wave
+from typing import List
+
+import numpy as np
+from llama_index.core.embeddings import MultiModalEmbedding
+from PIL import Image
+
+from processors.llms.base import LLM
+from processors.video.transcription import read_samples
+
+VOCABULARY = [
+    "engine", "battery", "orbit", "harbor", "violin", "glacier", "pixel", "compiler",
+    "lantern", "tractor", "meteor", "saffron", "quartz", "falcon", "turbine", "canyon",
+]
+
+
+class StubTranscriber:
+    """
+    Deterministic stand-in for `ChunkedTranscriber`.
+
+    The WAV file is read window by window like the real transcriber does, and every
+    `segment_seconds` produce one segment whose text depends only on its index and on
+    whether the window is silent, e.g. "segment 3 tone engine orbit ...".
+    """
+
+    def __init__(self, segment_seconds: float = 4.0, words: int = 12):
+        self.segment_seconds = segment_seconds
+        self.words = words
+
+    def transcribe(self, audio_path: str) -> List[dict]:
+        segments = []
+        with wave.open(audio_path, "rb") as source:
+            duration = source.getnframes() / source.getframerate()
+            start, idx = 0.0, 0
+            while start < duration:
+                end = min(duration, start + self.segment_seconds)
+                samples = read_samples(source, start, end)
+                loudness = "tone" if samples.size and float(np.abs(samples).max()) > 0.01 else "silence"
+                words = [VOCABULARY[(idx * 7 + offset * 3) % len(VOCABULARY)] for offset in range(self.words)]
+                segments.append({"start": start, "end": end, "text": f"segment {idx} {loudness} {' '.join(words)}"})
+                start, idx = end, idx + 1
+        return segments
+
+
+def _hash_vector(text: str, dim: int) -> List[float]:
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in text.lower().split():
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dim] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class StubEmbedding(MultiModalEmbedding):
+    """
+    Deterministic text and image embeddings of the same dimension, cheap enough to
+    leave the rest of the pipeline as the bottleneck. Text is a signed hashed bag of
+    words; an image is its grayscale thumbnail of `dim` pixels, so frames are still
+    decoded from disk.
+    """
+
+    model_name: str = "stub"
+    dim: int = 64
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return _hash_vector(text, self.dim)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return _hash_vector(query, self.dim)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_image_embedding(self, img_file_path) -> List[float]:
+        side = int(self.dim ** 0.5)
+        with Image.open(img_file_path) as image:
+            pixels = np.asarray(image.convert("L").resize((side, side)), dtype=np.float32).ravel()
+        vector = np.zeros(self.dim, dtype=np.float32)
+        vector[:pixels.size] = pixels - pixels.mean()
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    async def _aget_image_embedding(self, img_file_path) -> List[float]:
+        return self._get_image_embedding(img_file_path)
+
+
+class StubLLM(LLM):
+    """
+    LLM that answers with a fixed-length summary of its inputs after `latency` seconds,
+    streaming one word at a time.
+    """
+
+    def __init__(self, config, latency: float = 0.0, words: int = 32):
+        super().__init__(config=config)
+        self.latency = latency
+        self.words = words
+
+    def _answer(self, prompt: str, images: list) -> List[str]:
+        words = [f"answer from {len(prompt)} prompt characters and {len(images)} images"]
+        return (words + ["lorem"] * self.words)[:self.words]
+
+    def generate(self, prompt: str, images: list):
+        time.sleep(self.latency)
+        return " ".join(self._answer(prompt, images))
+
+    async def agenerate(self, prompt: str, images: list):
+        await asyncio.sleep(self.latency)
+        for idx, word in enumerate(self._answer(prompt, images)):
+            yield word if idx == 0 else " " + word
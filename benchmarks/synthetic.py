@@ -0,0 +1,45 @@
+import os
+import subprocess
+
+import imageio_ffmpeg
+
+
+def make_video(
+    output_path: str,
+    seconds: float,
+    width: int = 640,
+    height: int = 360,
+    fps: int = 25,
+    tone_hz: int = 440
+) -> str:
+    """
+    Render a synthetic test video with ffmpeg's `testsrc2` pattern and a tone that is
+    on for 3 seconds and silent for 1, so silence-aware chunking has boundaries to find.
+    Existing files are reused.
+
+    Parameters:
+    output_path (str): The path of the .mp4 file to write.
+    seconds (float): Length of the video.
+    width (int), height (int): Frame size in pixels.
+    fps (int): Frame rate of the video stream.
+    tone_hz (int): Frequency of the audio tone.
+
+    Returns:
+    str: `output_path`.
+    """
+    if os.path.exists(output_path):
+        return output_path
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    partial_path = output_path + ".part.mp4"
+    subprocess.run(
+        [
+            imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={seconds}",
+            "-f", "lavfi", "-i", f"aevalsrc=0.5*sin({tone_hz}*2*PI*t)*lt(mod(t\\,4)\\,3):s=16000:d={seconds}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest", partial_path
+        ],
+        check=True
+    )
+    os.replace(partial_path, output_path)
+    return output_path
@@ -1,15 +1,11 @@
-import base64
 import os
 import json
-import tempfile
 
 import gradio as gr
-from llama_index.core import StorageContext
-from llama_index.vector_stores.lancedb import LanceDBVectorStore
 
-from processors import VideoProcessor, Retriever, Config
-from processors.processor import ConversationBot
-from processors.llms import GPT4o
+from processors import Config
+from processors.registry import ModelRegistry
+from processors.serving import AdmissionError, SessionManager
 
 log_to_console = False
 
@@ -17,76 +13,25 @@ temp_files = []
 
 
 class App:
-    def __init__(self):
-        config = Config(output_folder="temp_data", video_fps=0.2, max_new_tokens=1500)
-        output_folder = tempfile.TemporaryDirectory(dir=config.output_folder)
-
-        video_processor = VideoProcessor(config=config)
-        self.retriever = Retriever(config=config)
-        llm = GPT4o(config=config)
-
-        self.bot = ConversationBot(
-            video_processor=video_processor,
-            retriever_processor=self.retriever,
-            config=config,
-            database_path=output_folder.name,
-            llm=llm
+    def __init__(self, max_ingestions: int = 2, max_pending: int = 8, warm_up: bool = True):
+        # Models are loaded once per process and shared by every browser session;
+        # each session only owns a lightweight bot bound to its own video.
+        self.registry = ModelRegistry()
+        self.sessions = SessionManager(self.registry, max_ingestions=max_ingestions, max_pending=max_pending)
+        config = self.config()
+        os.makedirs(config.output_folder, exist_ok=True)
+        if warm_up:
+            self.registry.warm_up(config)
+
+    @staticmethod
+    def config(openai_api_key: str = None, tokens: int = 1500) -> Config:
+        return Config(
+            output_folder="temp_data",
+            video_fps=0.2,
+            max_new_tokens=int(tokens),
+            openai_api_key=openai_api_key or None,
+            cache_dir="video_cache",
         )
-        self.bot = None
-
-    def encode_image(self, image_data):
-        """Generates a prefix for image base64 data in the required format for the
-        four known image formats: png, jpeg, gif, and webp.
-
-        Args:
-        image_data: The image data, encoded in base64.
-
-        Returns:
-        A string containing the prefix.
-        """
-
-        # Get the first few bytes of the image data.
-        magic_number = image_data[:4]
-
-        # Check the magic number to determine the image type.
-        if magic_number.startswith(b'\x89PNG'):
-            image_type = 'png'
-        elif magic_number.startswith(b'\xFF\xD8'):
-            image_type = 'jpeg'
-        elif magic_number.startswith(b'GIF89a'):
-            image_type = 'gif'
-        elif magic_number.startswith(b'RIFF'):
-            if image_data[8:12] == b'WEBP':
-                image_type = 'webp'
-            else:
-                # Unknown image type.
-                raise Exception("Unknown image type")
-        else:
-            # Unknown image type.
-            raise Exception("Unknown image type")
-
-        return f"data:image/{image_type};base64,{base64.b64encode(image_data).decode('utf-8')}"
-
-    def encode_file(self, fn: str) -> list:
-        user_msg_parts = []
-
-        with open(fn, mode="rb") as f:
-            content = f.read()
-
-        if isinstance(content, bytes):
-            try:
-                # try to add as image
-                content = self.encode_image(content)
-            except:
-                # not an image, try text
-                pass
-        else:
-            content = str(content)
-
-        user_msg_parts.append({"type": "image_url",
-                               "image_url": {"url": content}})
-
-        return user_msg_parts
 
     def undo(self, history):
         history.pop()
@@ -99,88 +44,53 @@ class App:
         # Dummy Python function, actual loading is done in JS
         pass
 
-    def save_settings(self, openai_api_key, video_url, tokens: int):
-        print(88888888)
-        # Dummy Python function, actual saving is done in JS
-        config = Config(
-            output_folder="temp_data",
-            video_fps=0.2,
-            max_new_tokens=tokens,
-            openai_api_key=openai_api_key,
-        )
-        output_folder = tempfile.TemporaryDirectory(dir=config.output_folder)
-
-        video_processor = VideoProcessor(config=config)
-        retriever = Retriever(config=config)
-        llm = GPT4o(config=config)
-
-        self.bot = ConversationBot(
-            video_processor=video_processor,
-            retriever_processor=retriever,
-            config=config,
-            database_path=output_folder.name,
-            llm=llm
-        )
-        self.bot.read_video(url=video_url)
-        self.bot.index(data_path=output_folder.name)
+    def save_settings(self, openai_api_key, video_url, tokens: int, request: gr.Request):
+        # Ingestion runs in the background pool; this only reports its progress.
+        try:
+            status = self.sessions.ingest(request.session_hash, video_url, self.config(openai_api_key, tokens))
+        except AdmissionError as e:
+            raise gr.Error(str(e))
+        while not status.wait(timeout=0.5):
+            yield status.describe()
+        if status.error:
+            raise gr.Error(status.describe())
+        yield status.describe()
+
+    def close_session(self, request: gr.Request):
+        self.sessions.close(request.session_hash)
 
     SYS_PROMPT = ""
 
     def format_messages(self, history: list):
         return "\n".join([f"{ele['role']}: {ele['content']}" for ele in history])
 
-    def main(self, message, history, oai_key, video_url, max_tokens):
+    async def main(self, message, history, oai_key, video_url, max_tokens, request: gr.Request):
         try:
             if log_to_console:
                 print(f"bot history: {str(history)}")
 
-            history_openai_format = []
-            user_msg_parts = []
-            history_openai_format.append({"role": "system", "content": self.SYS_PROMPT})
-            for human, assi in history:
-                if human is not None:
-                    if type(human) is tuple:
-                        user_msg_parts.extend(self.encode_file(human[0]))
-                    else:
-                        user_msg_parts.append({"type": "text", "text": human})
-
-                if assi is not None:
-                    if user_msg_parts:
-                        history_openai_format.append({"role": "user", "content": user_msg_parts})
-                        user_msg_parts = []
-
-                    history_openai_format.append({"role": "assistant", "content": assi})
-
-            if message['text']:
-                user_msg_parts.append({"type": "text", "text": message['text']})
-            if message['files']:
-                for file in message['files']:
-                    user_msg_parts.extend(self.encode_file(file['path']))
-            history_openai_format.append({"role": "user", "content": user_msg_parts})
-
-            if log_to_console:
-                print(f"br_prompt: {str(history_openai_format)}")
+            bot = self.sessions.bot(request.session_hash)
+            if bot is None:
+                raise gr.Error("Please save the settings with a video URL first.")
 
-            # response = client.chat.completions.create(
-            #     messages=history_openai_format,
-            #     max_tokens=max_tokens
-            # )
-            # TODO: generate response, chat function receive input as text
-            response = 1  # bot.chat(user_message=format_messages(history_openai_format))
+            # The bot keeps the conversation itself, packed into its token budget; the UI
+            # history only tells it when a chat was cleared.
+            response = ""
+            async for token in bot.achat(user_message=message['text'], history=history):
+                response += token
+                yield response
 
             if log_to_console:
                 print(f"br_response: {str(response)}")
 
-            # result = response.choices[0].message.content
-
             if log_to_console:
                 print(f"br_result: {str(history)}")
 
+        except gr.Error:
+            raise
         except Exception as e:
             raise gr.Error(f"Error: {str(e)}")
 
-        return response
-
     def import_history(self, history, file):
         with open(file.name, mode="rb") as f:
             content = f.read()
@@ -219,15 +129,23 @@ class App:
             max_tokens = gr.Slider(1, 4000, label="Max. Tokens", elem_id="max_tokens", value=1500)
             save_button = gr.Button("Save Settings")
 
-            save_button.click(self.save_settings, [oai_key, video_url, max_tokens], show_progress=True)
+            status = gr.Markdown(elem_id="ingestion_status")
+
+            # Progress polling and chat are cheap; admission control happens in SessionManager.
+            save_button.click(
+                self.save_settings, [oai_key, video_url, max_tokens], status,
+                show_progress=True, concurrency_limit=None
+            )
             controls = [oai_key, video_url, max_tokens]
 
-            chat = gr.ChatInterface(fn=self.main, multimodal=True, additional_inputs=controls)
+            chat = gr.ChatInterface(fn=self.main, multimodal=True, additional_inputs=controls, concurrency_limit=None)
             chat.textbox.file_count = "multiple"
             chatbot = chat.chatbot
             chatbot.show_copy_button = True
             chatbot.height = 500
 
+            demo.unload(self.close_session)
+
         # demo.unload(lambda: [os.remove(file) for file in temp_files])
         demo.queue()
         demo.launch(debug=debug, server_port=port, share=share)
@@ -0,0 +1,95 @@
+"""
+Batch ingestion: download, process and index many videos into the shared store.
+
+    python ingest.py urls.txt https://www.youtube.com/playlist?list=... ./videos --workers 4
+
+Sources are queued in a SQLite file and worked off by a pool of processes. Running
+the command again (with or without new sources) resumes the queue; other machines
+can join by pointing `--queue` at the same file.
+"""
+import argparse
+import multiprocessing
+import sys
+
+from loguru import logger
+
+from processors.ingest import STAGES, JobQueue, expand_sources, run_worker
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="URLs, playlist URLs, .txt URL lists, video files or directories.")
+    parser.add_argument("--queue", default="ingest_queue.sqlite", help="Job queue database.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes.")
+    parser.add_argument("--max-download", type=int, default=2, help="Concurrent downloads.")
+    parser.add_argument("--max-decode", type=int, default=None, help="Concurrent frame decodes (default: workers).")
+    parser.add_argument("--max-transcribe", type=int, default=1, help="Concurrent ASR jobs.")
+    parser.add_argument("--max-index", type=int, default=None, help="Concurrent indexing jobs (default: workers).")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per video before giving up.")
+    parser.add_argument("--lease", type=float, default=120, help="Seconds before a silent worker's job is re-run.")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-queue videos that ran out of attempts.")
+    parser.add_argument("--status", action="store_true", help="Print the queue state and exit.")
+    parser.add_argument("--output-folder", default="temp_data")
+    parser.add_argument("--cache-dir", default="video_cache", help="Ingestion cache, needed to resume videos.")
+    parser.add_argument("--lancedb-uri", default="lancedb")
+    parser.add_argument("--video-fps", type=float, default=1)
+    parser.add_argument("--asr-workers", type=int, default=1, help="ASR processes per transcribe job.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    queue = JobQueue(args.queue, lease_seconds=args.lease, max_attempts=args.max_attempts)
+    if args.sources:
+        added = queue.add(expand_sources(args.sources))
+        logger.info(f"Queued {added} new videos")
+    if args.retry_failed:
+        logger.info(f"Re-queued {queue.retry_failed()} failed videos")
+    if args.status:
+        for job in queue.jobs():
+            print(f"{job['status']:8} {job['stage'] or '-':10} {job['attempts']} {job['url']} {job['error'] or ''}")
+        print(queue.counts())
+        return
+    if not queue.pending():
+        logger.info(f"Nothing to do: {queue.counts()}")
+        return
+
+    context = multiprocessing.get_context("spawn")
+    limits = {
+        "download": args.max_download,
+        "decode": args.max_decode,
+        "transcribe": args.max_transcribe,
+        "index": args.max_index,
+    }
+    semaphores = {
+        stage: context.BoundedSemaphore(limit) for stage, limit in limits.items()
+        if stage in STAGES and limit and limit < args.workers
+    }
+    config_kwargs = {
+        "output_folder": args.output_folder,
+        "video_fps": args.video_fps,
+        "cache_dir": args.cache_dir,
+        "lancedb_uri": args.lancedb_uri,
+        "asr_workers": args.asr_workers,
+    }
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(args.queue, config_kwargs, semaphores, args.lease, args.max_attempts),
+            name=f"ingest-{idx}"
+        )
+        for idx in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    counts = queue.counts()
+    logger.info(f"Ingestion finished: {counts}")
+    if counts.get("failed"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,45 @@
+import argparse
+import asyncio
 import tempfile
+import threading
+import time
 
-from processors import VideoProcessor, Retriever, Config
+from loguru import logger
+
+started = time.perf_counter()
+from processors import Config
 from processors.processor import ConversationBot
-from processors.llms import GPT4o
+from processors.registry import ModelRegistry
+import_seconds = time.perf_counter() - started
 
-if __name__ == "__main__":
-    config = Config(output_folder="temp_data", video_fps=1, max_new_tokens=1500)
-    output_folder = tempfile.TemporaryDirectory(dir=config.output_folder)
 
-    video_processor = VideoProcessor(config=config)
-    retriever = Retriever(config=config)
-    llm = GPT4o(config=config)
+async def chat_loop(bot: ConversationBot):
+    # One event loop for the whole session, so the async LLM client can reuse its connections.
+    while True:
+        user_msg = await asyncio.to_thread(input, "User: ")
+        if not user_msg:
+            continue
+        if bot.partial:
+            print(f"\033[90m{bot.coverage.describe()}\033[00m")
+        print("\033[92mBot: ", end="", flush=True)
+        async for token in bot.achat(user_message=user_msg):
+            print(token, end="", flush=True)
+        print("\n\033[00m")
 
-    bot = ConversationBot(
-        video_processor=video_processor,
-        retriever_processor=retriever,
-        config=config,
-        database_path=output_folder.name,
-        llm=llm
-    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-warm-up", dest="warm_up", action="store_false",
+                        help="Load models on first use instead of while the URL is typed.")
+    parser.add_argument("--startup-report", action="store_true", help="Print import and model load times.")
+    args = parser.parse_args()
+
+    config = Config(output_folder="temp_data", video_fps=1, max_new_tokens=1500, cache_dir="video_cache")
+    registry = ModelRegistry()
+    registry.timings["import processors"] = import_seconds
+    if args.warm_up:
+        # Imports and model loading overlap with the user typing the URL.
+        registry.warm_up(config)
 
     url = None
     while not url:
@@ -27,15 +48,39 @@ if __name__ == "__main__":
             import sys
 
             sys.exit()
-    print(f"Reading video from url: {url} ...")
-    bot.read_video(url=url)
+    # Already imported by the warm-up thread unless it was disabled.
+    from processors import VideoProcessor, Retriever
 
-    print("Indexing data ...")
-    bot.index(data_path=output_folder.name)
+    # With an ingestion cache every video gets its entry folder from the cache.
+    output_folder = None if config.cache_dir else tempfile.TemporaryDirectory(dir=config.output_folder)
+    bot = ConversationBot(
+        video_processor=VideoProcessor(config=config, transcriber=registry.transcriber(config)),
+        retriever_processor=Retriever(config=config, registry=registry),
+        config=config,
+        database_path=output_folder.name if output_folder is not None else config.output_folder,
+        llm=registry.llm(config)
+    )
 
-    while True:
-        user_msg = input("User: ")
-        if not user_msg:
-            continue
-        response = bot.chat(user_message=user_msg)
-        print(f"\033[92mBot: {response}\n\033[00m")
+    errors = []
+
+    def ingest():
+        try:
+            bot.read_video(url=url)
+            bot.index()
+        except Exception as e:
+            logger.exception(f"Failed to process {url}")
+            errors.append(e)
+
+    # With progressive indexing the chat starts as soon as the first part of the video
+    # is indexed, while the rest is processed in the background.
+    print(f"Reading video from url: {url} ...")
+    ingestion = threading.Thread(target=ingest, name="ingestion", daemon=True)
+    ingestion.start()
+    while ingestion.is_alive() and not bot.queryable:
+        ingestion.join(timeout=0.5)
+    if errors:
+        raise errors[0]
+    if args.startup_report:
+        print(registry.startup_report())
+
+    asyncio.run(chat_loop(bot))
@@ -1,3 +1,14 @@
-from processors.video import VideoProcessor
-from processors.retriever import Retriever
-from processors.config import Config
+import time
+
+from processors._lazy import lazy_module
+
+# Reference point for the startup report, see `ModelRegistry.startup_report`.
+IMPORTED_AT = time.perf_counter()
+
+# Heavy modules (llama-index, LanceDB, moviepy, ...) are only imported when one of
+# these names is first accessed, so `import processors` stays cheap.
+__getattr__, __dir__ = lazy_module(__name__, {
+    "VideoProcessor": "processors.video.processor",
+    "Retriever": "processors.retriever.processor",
+    "Config": "processors.config",
+})
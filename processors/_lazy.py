@@ -0,0 +1,30 @@
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_module(module_name: str, attributes: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    Build the module-level `__getattr__` and `__dir__` (PEP 562) of a package whose
+    public names are only imported from their modules when first accessed.
+
+    Parameters:
+    module_name (str): `__name__` of the package.
+    attributes (dict): Public name -> module that defines it.
+
+    Returns:
+    tuple: `(__getattr__, __dir__)`, to be assigned at the package's top level.
+    """
+
+    def __getattr__(name: str):
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name]), name)
+            # Cache it on the package so later lookups bypass `__getattr__`.
+            setattr(sys.modules[module_name], name, value)
+            return value
+        raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[module_name])) | set(attributes))
+
+    return __getattr__, __dir__
@@ -0,0 +1,111 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from processors.telemetry import telemetry
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", query.lower())).strip()
+
+
+class AnswerCache:
+    """
+    Cache of answers per video, looked up by exact and then by semantic match.
+
+    Answers are also keyed by `history`, a digest of the conversation the question
+    was asked in ("" for a first question), since a follow-up means something else
+    after different turns. A query first matches exactly (after lower-casing and
+    stripping punctuation and extra whitespace). Otherwise it is embedded with
+    `embed_fn` and matched against the earlier queries of the same video and
+    history; the closest one is used if its cosine similarity is at least
+    `threshold`. Entries expire after `ttl_seconds` and the
+    least recently used are evicted beyond `max_entries` in total.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], List[float]] = None,
+        threshold: float = 0.92,
+        ttl_seconds: float = 3600,
+        max_entries: int = 512
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pending_embeddings = {}
+        self._lock = threading.Lock()
+
+    def _expired(self, entry: dict) -> bool:
+        return self.ttl_seconds is not None and time.time() - entry["created"] > self.ttl_seconds
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        if self.embed_fn is None:
+            return None
+        vector = np.asarray(self.embed_fn(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, video_key: str, query: str, history: str = "") -> Optional[str]:
+        key = (video_key, history, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                telemetry.count("answer_cache_lookups", result="exact")
+                return entry["answer"]
+
+            candidates = [
+                (candidate_key, candidate) for candidate_key, candidate in self._entries.items()
+                if candidate_key[:2] == key[:2] and candidate["embedding"] is not None
+                and not self._expired(candidate)
+            ]
+
+        embedding = self._embed(query) if candidates else None
+        if embedding is not None:
+            similarities = np.stack([candidate["embedding"] for _, candidate in candidates]) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                best_key, best_entry = candidates[best]
+                with self._lock:
+                    if best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                telemetry.count("answer_cache_lookups", result="semantic")
+                return best_entry["answer"]
+
+        telemetry.count("answer_cache_lookups", result="miss")
+        with self._lock:
+            if embedding is not None:
+                # Keep the query embedding for the `put` that usually follows a miss.
+                if len(self._pending_embeddings) >= self.max_entries:
+                    self._pending_embeddings.clear()
+                self._pending_embeddings[key] = embedding
+        return None
+
+    def put(self, video_key: str, query: str, answer: str, history: str = ""):
+        key = (video_key, history, normalize_query(query))
+        with self._lock:
+            embedding = self._pending_embeddings.pop(key, None)
+        if embedding is None:
+            embedding = self._embed(query)
+        with self._lock:
+            self._entries[key] = {"answer": answer, "embedding": embedding, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, video_key: str):
+        """
+        Drop every answer cached for a video, e.g. after its index was rebuilt.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == video_key]:
+                del self._entries[key]
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from typing import Callable, Tuple
+
+from loguru import logger
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Entries in use by a bot of this process, with their number of users; shared by all
+# `IngestionCache` instances so one session cannot evict another's video.
+_pins = Counter()
+_pins_lock = threading.Lock()
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_dir(follow_symlinks=False):
+            total += directory_size(entry.path)
+        else:
+            total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+class Manifest:
+    """
+    Record of the pipeline stages completed for one video.
+
+    Each completed stage stores a small dict of outputs (paths, metadata) so that a
+    later run can skip it. With `path=None` the manifest only lives in memory, which
+    is how the pipeline runs when caching is disabled.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"stages": {}, "last_access": time.time()}
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                self.data = json.load(file)
+
+    def done(self, stage: str) -> bool:
+        return stage in self.data["stages"]
+
+    def get(self, stage: str) -> dict:
+        return self.data["stages"].get(stage, {})
+
+    def complete(self, stage: str, **outputs):
+        with self._lock:
+            self.data["stages"][stage] = outputs
+            self.save()
+
+    def invalidate(self, stage: str):
+        with self._lock:
+            self.data["stages"].pop(stage, None)
+            self.save()
+
+    def touch(self):
+        self.data["last_access"] = time.time()
+        self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.data, file)
+        os.replace(tmp_path, self.path)
+
+
+class IngestionCache:
+    """
+    Persistent per-video artifact cache.
+
+    Entries are keyed by the video ID plus the pipeline parameters that affect the
+    artifacts, so changing e.g. the fps or the ASR model produces a new entry rather
+    than reusing stale frames. When the cache grows past `max_bytes`, the least
+    recently opened entries are evicted and `on_evict` is called with their key.
+    Entries that are `pin`ned, i.e. in use by a bot, are never evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = None, on_evict: Callable[[str], None] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(video_id: str, params: dict) -> str:
+        payload = json.dumps({"video_id": video_id, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+    def open(self, video_id: str, params: dict) -> Tuple[str, Manifest]:
+        """
+        Return the entry folder and manifest for a video, creating them if needed.
+        The entry stays pinned until the caller is done with it and calls `unpin`.
+        """
+        key = self.key(video_id, params)
+        entry = os.path.join(self.root, key)
+        self.pin(entry)
+        os.makedirs(entry, exist_ok=True)
+
+        manifest = Manifest(os.path.join(entry, MANIFEST_FILENAME))
+        manifest.data.setdefault("video_id", video_id)
+        manifest.data.setdefault("params", params)
+        manifest.touch()
+        if manifest.data["stages"]:
+            logger.info(f"Resuming cached video {video_id} after stages: {', '.join(manifest.data['stages'])}")
+
+        self.evict(keep=entry)
+        return entry, manifest
+
+    @staticmethod
+    def pin(entry: str):
+        with _pins_lock:
+            _pins[os.path.abspath(entry)] += 1
+
+    @staticmethod
+    def unpin(entry: str):
+        entry = os.path.abspath(entry)
+        with _pins_lock:
+            _pins[entry] -= 1
+            if _pins[entry] <= 0:
+                del _pins[entry]
+
+    @staticmethod
+    def pinned(entry: str) -> bool:
+        with _pins_lock:
+            return os.path.abspath(entry) in _pins
+
+    def evict(self, keep: str = None):
+        """
+        Delete least recently used entries until the cache fits in `max_bytes`.
+        """
+        if self.max_bytes is None:
+            return
+
+        entries = []
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            if not os.path.isdir(entry):
+                continue
+            last_access = Manifest(os.path.join(entry, MANIFEST_FILENAME)).data.get("last_access", 0)
+            entries.append((last_access, entry, directory_size(entry)))
+
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep or self.pinned(entry):
+                continue
+            logger.info(f"Evicting cached video {entry} ({size / 1e6:.1f} MB)")
+            shutil.rmtree(entry, ignore_errors=True)
+            if self.on_evict is not None:
+                self.on_evict(os.path.basename(entry))
+            total -= size
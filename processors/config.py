@@ -1,15 +1,250 @@
 import os
 
 
+def model_id(model) -> str:
+    """
+    Name of an embedding model given either as a `resolve_embed_model` string or as
+    an already constructed model instance.
+    """
+    if isinstance(model, str):
+        return model
+    return f"{type(model).__name__}:{getattr(model, 'model_name', '')}"
+
+
 class Config:
     def __init__(
         self,
         output_folder: str,
         video_fps: float = 0.02,
         max_new_tokens: int = 1500,
-        openai_api_key: str = None
+        openai_api_key: str = None,
+        openai_api_base: str = None,
+        frame_extraction: str = "stream",
+        frame_format: str = "png",
+        frame_quality: int = 90,
+        frame_workers: int = 4,
+        frame_store: str = None,
+        frame_store_max_side: int = 768,
+        keyframe_method: str = None,
+        keyframe_threshold: float = None,
+        asr_model: str = "base",
+        asr_chunk_seconds: float = 30.0,
+        asr_overlap_seconds: float = 2.0,
+        asr_split_on_silence: bool = True,
+        asr_workers: int = 2,
+        transcript_window_seconds: float = 30.0,
+        transcript_stride_seconds: float = 15.0,
+        text_embed_model: str = "default",
+        image_embed_model: str = "clip:ViT-B/32",
+        cache_dir: str = None,
+        cache_max_bytes: int = 20 * 1024 ** 3,
+        lancedb_uri: str = "lancedb",
+        ann_index_threshold: int = 10000,
+        ann_num_partitions: int = 256,
+        ann_nprobes: int = 20,
+        ann_refine_factor: int = None,
+        embedding_cache_dir: str = "embedding_cache",
+        embed_batch_size: int = 32,
+        embed_workers: int = 4,
+        embed_torch_threads: int = None,
+        concurrent_stages: bool = True,
+        progressive_indexing: bool = True,
+        stage_queue_size: int = 64,
+        download_mode: str = "split",
+        image_input_size: int = 224,
+        image_detail: str = "low",
+        image_max_bytes: int = None,
+        image_quality: int = 85,
+        image_tile: int = 1,
+        image_cache_size: int = 256,
+        answer_cache: bool = False,
+        answer_cache_threshold: float = 0.92,
+        answer_cache_ttl: float = 3600,
+        answer_cache_size: int = 512,
+        retrieval_cache_size: int = 1024,
+        similarity_top_k: int = 3,
+        image_similarity_top_k: int = 3,
+        hybrid_search: bool = True,
+        lexical_top_k: int = 10,
+        rrf_k: int = 60,
+        lexical_fast_path: bool = True,
+        telemetry: bool = False,
+        trace_path: str = None,
+        metrics_port: int = None,
+        context_token_budget: int = 6000,
+        history_turns: int = 6,
+        tokenizer_model: str = "gpt-4o",
+        context_window_seconds: float = 0,
+        context_window_frames: int = 1
     ):
         self.output_folder = output_folder
         self.video_fps = video_fps
         self.max_new_tokens = max_new_tokens
         self.OPENAI_API_TOKEN = openai_api_key if openai_api_key is not None else os.getenv("OPENAI_API_TOKEN")
+        # OpenAI-compatible endpoint, e.g. a local fake server in tests; None uses the default.
+        self.openai_api_base = openai_api_base if openai_api_base is not None else os.getenv("OPENAI_API_BASE")
+
+        # Frame extraction: "stream" decodes the video once with an ffmpeg fps filter,
+        # "seek" keeps the old per-timestamp `get_frame` behaviour.
+        self.frame_extraction = frame_extraction
+        # Output image format for extracted frames: "png", "jpeg" or "webp".
+        self.frame_format = frame_format
+        # Encoder quality (1-100), ignored for lossless png.
+        self.frame_quality = frame_quality
+        # Number of threads encoding frames to disk in parallel.
+        self.frame_workers = frame_workers
+        # Where frames go: None writes one image file per frame, "raw" appends downscaled
+        # RGB arrays and "compressed" appends `frame_format` blobs to a single
+        # memory-mapped container per video. Stored frames are at most
+        # `frame_store_max_side` pixels on their longer side (None keeps the size).
+        self.frame_store = frame_store
+        self.frame_store_max_side = frame_store_max_side
+
+        # Keyframe selection before indexing: None keeps every sampled frame,
+        # otherwise one of "histogram", "phash" or "pixel".
+        self.keyframe_method = keyframe_method
+        # Minimum normalized distance to the last kept frame, None uses the method default.
+        self.keyframe_threshold = keyframe_threshold
+
+        # Whisper model used for speech recognition.
+        self.asr_model = asr_model
+        # Audio is transcribed in chunks of at most `asr_chunk_seconds`, each padded with
+        # `asr_overlap_seconds` of context on both sides.
+        self.asr_chunk_seconds = asr_chunk_seconds
+        self.asr_overlap_seconds = asr_overlap_seconds
+        # Move chunk boundaries to the quietest point near each nominal boundary.
+        self.asr_split_on_silence = asr_split_on_silence
+        # Number of worker processes transcribing chunks, 1 runs in-process.
+        self.asr_workers = asr_workers
+
+        # Transcript segments are indexed as sliding windows of `transcript_window_seconds`,
+        # starting every `transcript_stride_seconds`.
+        self.transcript_window_seconds = transcript_window_seconds
+        self.transcript_stride_seconds = transcript_stride_seconds
+
+        # Embedding models, in any form accepted by llama-index `resolve_embed_model`.
+        self.text_embed_model = text_embed_model
+        self.image_embed_model = image_embed_model
+
+        # Persistent ingestion cache: None processes every video from scratch into
+        # `output_folder`, otherwise artifacts are kept per video under `cache_dir`
+        # and evicted least-recently-used once they exceed `cache_max_bytes`.
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+
+        # Shared LanceDB database holding one text and one image table per video.
+        self.lancedb_uri = lancedb_uri
+        # Tables with at least `ann_index_threshold` rows get an IVF-PQ index with up to
+        # `ann_num_partitions` partitions; queries probe `ann_nprobes` partitions and
+        # re-rank `ann_refine_factor` times more candidates exactly (None disables).
+        self.ann_index_threshold = ann_index_threshold
+        self.ann_num_partitions = ann_num_partitions
+        self.ann_nprobes = ann_nprobes
+        self.ann_refine_factor = ann_refine_factor
+
+        # Content-addressed embedding cache shared by all videos, None disables it.
+        self.embedding_cache_dir = embedding_cache_dir
+        # Images are embedded `embed_batch_size` at a time while `embed_workers` threads
+        # decode the next batches; `embed_torch_threads` caps torch intra-op threads
+        # (None leaves torch's default, which uses every core).
+        self.embed_batch_size = embed_batch_size
+        self.embed_workers = embed_workers
+        self.embed_torch_threads = embed_torch_threads
+
+        # Run frame extraction, audio + ASR and frame embedding concurrently, with at most
+        # `stage_queue_size` frames waiting between extraction and embedding.
+        self.concurrent_stages = concurrent_stages
+        self.stage_queue_size = stage_queue_size
+        # Insert frames and transcript windows into the index as they are produced, so a
+        # video can be queried about its processed part while the rest is still running
+        # (frames are only streamed with `concurrent_stages`).
+        self.progressive_indexing = progressive_indexing
+
+        # "split" downloads an audio-only stream and the smallest video stream whose
+        # frames are at least `image_input_size` pixels high (the image embedding
+        # model's input size); "muxed" downloads the best single file.
+        self.download_mode = download_mode
+        self.image_input_size = image_input_size
+
+        # Frames sent to the LLM are downscaled for `image_detail` ("low", "high" or
+        # "auto"), re-encoded as JPEG at `image_quality` and, if `image_max_bytes` is set,
+        # compressed until they fit. `image_tile` > 1 packs that many adjacent frames into
+        # one contact sheet. Encoded frames are cached, up to `image_cache_size`.
+        self.image_detail = image_detail
+        self.image_max_bytes = image_max_bytes
+        self.image_quality = image_quality
+        self.image_tile = image_tile
+        self.image_cache_size = image_cache_size
+
+        # Per-video answer cache in front of `ConversationBot.chat`: exact query matches
+        # first, then queries whose embedding has cosine similarity >= the threshold.
+        # Follow-ups only match after the same remembered turns, so within one long
+        # conversation (launch.py) hits are rare; it pays off when many sessions ask
+        # about the same video, sharing the cache through `ModelRegistry`. Lookups are
+        # counted in the "answer_cache_lookups" telemetry counter. Answers expire after
+        # `answer_cache_ttl` seconds (None keeps them until the index is rebuilt) and
+        # at most `answer_cache_size` are kept.
+        self.answer_cache = answer_cache
+        self.answer_cache_threshold = answer_cache_threshold
+        self.answer_cache_ttl = answer_cache_ttl
+        self.answer_cache_size = answer_cache_size
+
+        # Number of retrieved frame documents kept in memory between queries.
+        self.retrieval_cache_size = retrieval_cache_size
+
+        # Number of transcript windows and frames passed to the LLM per query.
+        self.similarity_top_k = similarity_top_k
+        self.image_similarity_top_k = image_similarity_top_k
+        # Also search the transcript with a local BM25 index (`lexical_top_k` candidates)
+        # and merge it with the vector hits by reciprocal rank fusion with constant `rrf_k`.
+        self.hybrid_search = hybrid_search
+        self.lexical_top_k = lexical_top_k
+        self.rrf_k = rrf_k
+        # Answer queries wrapped in double quotes from the lexical index alone, without
+        # embedding the query or searching the vector tables.
+        self.lexical_fast_path = lexical_fast_path
+
+        # Record timed spans and counters for every stage. The trace is written as JSON to
+        # `trace_path` at exit (None keeps it in memory) and Prometheus metrics are served
+        # on `metrics_port` (None disables the endpoint).
+        self.telemetry = telemetry
+        self.trace_path = trace_path
+        self.metrics_port = metrics_port
+
+        # Prompts (retrieved context, frames and conversation history) are packed into at
+        # most `context_token_budget` tokens, counted locally with the tiktoken encoding of
+        # `tokenizer_model`; the last `history_turns` turns are remembered.
+        self.context_token_budget = context_token_budget
+        self.history_turns = history_turns
+        self.tokenizer_model = tokenizer_model
+
+        # Expand every retrieved frame or transcript window to the speech within
+        # ±`context_window_seconds` around it plus up to `context_window_frames` nearby
+        # frames, using the per-video time index. Off by default (0): it enlarges every
+        # prompt, so enable it (e.g. 10 seconds) where answers need surrounding context.
+        self.context_window_seconds = context_window_seconds
+        self.context_window_frames = context_window_frames
+
+    def pipeline_params(self) -> dict:
+        """
+        Settings that change the artifacts produced for a video, used in cache keys.
+        """
+        return {
+            "download_mode": self.download_mode,
+            "image_input_size": self.image_input_size,
+            "video_fps": self.video_fps,
+            "frame_format": self.frame_format,
+            "frame_quality": self.frame_quality,
+            "frame_store": self.frame_store,
+            "frame_store_max_side": self.frame_store_max_side if self.frame_store else None,
+            "keyframe_method": self.keyframe_method,
+            "keyframe_threshold": self.keyframe_threshold,
+            "asr_model": self.asr_model,
+            "asr_chunk_seconds": self.asr_chunk_seconds,
+            "asr_overlap_seconds": self.asr_overlap_seconds,
+            "asr_split_on_silence": self.asr_split_on_silence,
+            "transcript_window_seconds": self.transcript_window_seconds,
+            "transcript_stride_seconds": self.transcript_stride_seconds,
+            "text_embed_model": model_id(self.text_embed_model),
+            "image_embed_model": model_id(self.image_embed_model),
+        }
@@ -0,0 +1,196 @@
+import hashlib
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from processors.retriever.results import ImageHit, RetrievalResult, TextHit
+
+# Prompt tokens charged per image by OpenAI: "low" detail is a flat 85, "high" is
+# 85 + 170 per 512px tile, i.e. 6 tiles for a 16:9 frame scaled to a 768px short side.
+IMAGE_TOKENS = {"low": 85, "high": 1105, "auto": 1105}
+
+
+class TokenCounter:
+    """
+    Count tokens locally with tiktoken, falling back to ~4 characters per token when
+    tiktoken is not installed.
+    """
+
+    def __init__(self, model: str = "gpt-4o"):
+        self.model = model
+        self._encoding = None
+        try:
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            logger.warning("tiktoken is not installed, token counts are estimated from text length")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is None:
+            return math.ceil(len(text) / 4)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class Turn:
+    query: str
+    answer: str
+    texts: List[TextHit] = field(default_factory=list)
+    images: List[ImageHit] = field(default_factory=list)
+
+    def format(self) -> str:
+        return f"User: {self.query}\nAssistant: {self.answer}"
+
+
+@dataclass
+class PackedContext:
+    prompt: str
+    texts: List[TextHit]
+    images: List[ImageHit]
+    history: List[Turn]
+    tokens: int
+    dropped: int = 0
+
+
+class ContextBuilder:
+    """
+    Pack retrieved transcript windows, frames and conversation history into a prompt
+    of at most `budget` tokens (images included).
+
+    Every chunk and frame appears at most once per prompt. Items retrieved for the
+    current question that were not shown in earlier turns go first, in rank order,
+    then the most recent turns of the conversation, then retrieved items that were
+    already shown in earlier turns, while the budget lasts. The history only carries
+    the questions and answers, so a window retrieved again is packed in full rather
+    than referenced. Transcript windows are put back in chronological order so the
+    prompt reads like the video.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        budget: int = 6000,
+        image_tokens: int = IMAGE_TOKENS["low"],
+        images_per_payload: int = 1,
+        max_turns: int = 6
+    ):
+        self.counter = counter
+        self.budget = budget
+        self.image_tokens = image_tokens
+        self.images_per_payload = max(1, images_per_payload)
+        self.turns = deque(maxlen=max_turns)
+
+    def reset(self):
+        self.turns.clear()
+
+    def history_key(self) -> str:
+        """
+        Digest of the remembered turns, "" before the first one.
+        """
+        if not self.turns:
+            return ""
+        history = "\n".join(turn.format() for turn in self.turns)
+        return hashlib.sha256(history.encode("utf-8")).hexdigest()[:24]
+
+    def _shown(self) -> tuple:
+        texts = {hit.text for turn in self.turns for hit in turn.texts}
+        images = {hit.image_path for turn in self.turns for hit in turn.images}
+        return texts, images
+
+    def _image_cost(self, count: int) -> int:
+        return math.ceil(count / self.images_per_payload) * self.image_tokens
+
+    def build(self, query: str, result: RetrievalResult, render: Callable[[str, str], str]) -> PackedContext:
+        """
+        Parameters:
+        query (str): The user message.
+        result (RetrievalResult): What the retriever returned for it.
+        render (callable): Builds the prompt from a context string and a history string.
+
+        Returns:
+        PackedContext: The prompt and the hits and turns it contains.
+        """
+        shown_texts, shown_images = self._shown()
+        remaining = self.budget - self.counter.count(render("", ""))
+
+        texts, text_keys = [], set()
+        images, image_keys = [], set()
+        history = []
+        dropped = set()
+
+        def add_text(hit: TextHit) -> bool:
+            nonlocal remaining
+            if hit.text in text_keys:
+                return True
+            cost = self.counter.count(hit.format()) + 1
+            if cost > remaining:
+                dropped.add(hit.text)
+                return False
+            texts.append(hit)
+            text_keys.add(hit.text)
+            remaining -= cost
+            return True
+
+        def add_image(hit: ImageHit) -> bool:
+            nonlocal remaining
+            if hit.image_path in image_keys:
+                return True
+            cost = self._image_cost(len(images) + 1) - self._image_cost(len(images))
+            if cost > remaining:
+                dropped.add(hit.image_path)
+                return False
+            images.append(hit)
+            image_keys.add(hit.image_path)
+            remaining -= cost
+            return True
+
+        for hit in result.texts:
+            if hit.text not in shown_texts:
+                add_text(hit)
+        for hit in result.images:
+            if hit.image_path not in shown_images:
+                add_image(hit)
+
+        for turn in reversed(self.turns):
+            cost = self.counter.count(turn.format()) + 1
+            if cost > remaining:
+                break
+            history.insert(0, turn)
+            remaining -= cost
+
+        for hit in result.texts:
+            add_text(hit)
+        for hit in result.images:
+            add_image(hit)
+
+        texts.sort(key=lambda hit: (hit.start is None, hit.start or 0.0))
+        context_str = "\n".join(hit.format() for hit in texts)
+        history_str = "\n".join(turn.format() for turn in history)
+        prompt = render(context_str, history_str)
+        if dropped:
+            logger.debug(f"Context budget of {self.budget} tokens reached, {len(dropped)} items left out")
+        return PackedContext(
+            prompt=prompt,
+            texts=texts,
+            images=images,
+            history=history,
+            tokens=self.budget - remaining,
+            dropped=len(dropped)
+        )
+
+    def record(self, query: str, answer: str, packed: Optional[PackedContext] = None):
+        self.turns.append(Turn(
+            query=query,
+            answer=answer,
+            texts=list(packed.texts) if packed is not None else [],
+            images=list(packed.images) if packed is not None else []
+        ))
@@ -0,0 +1,9 @@
+from processors._lazy import lazy_module
+
+__getattr__, __dir__ = lazy_module(__name__, {
+    "JobQueue": "processors.ingest.queue",
+    "expand_sources": "processors.ingest.sources",
+    "STAGES": "processors.ingest.worker",
+    "StageGate": "processors.ingest.worker",
+    "run_worker": "processors.ingest.worker",
+})
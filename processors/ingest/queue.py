@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    namespace TEXT,
+    worker TEXT,
+    error TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+class JobQueue:
+    """
+    Durable ingestion work queue in a SQLite file.
+
+    A job is claimed atomically and then holds a lease that its worker renews with
+    `heartbeat`. Jobs whose lease expired (the worker crashed or its node went away)
+    are handed out again, and failed jobs are retried up to `max_attempts` times, so
+    a batch can be stopped and restarted at any point. Several processes, or nodes
+    sharing the file over a filesystem with working locks, can consume the same queue.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 120, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        # The connection is shared with the heartbeat thread of the worker.
+        self._lock = threading.Lock()
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def add(self, urls: Iterable[str]) -> int:
+        """
+        Enqueue URLs that are not queued yet; returns how many were added.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            cursor = self._connection.executemany(
+                "INSERT OR IGNORE INTO jobs (url, created, updated) VALUES (?, ?, ?)",
+                [(url, now, now) for url in urls]
+            )
+        return cursor.rowcount
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """
+        Take the oldest pending job, or one whose lease expired, and mark it running.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker died on their last attempt are not retried.
+                self._connection.execute(
+                    """
+                    UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired'), updated = ?
+                    WHERE status = 'running' AND heartbeat < ? AND attempts >= ?
+                    """,
+                    (now, now - self.lease_seconds, self.max_attempts)
+                )
+                row = self._connection.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE attempts < ? AND (status = 'pending' OR (status = 'running' AND heartbeat < ?))
+                    ORDER BY id LIMIT 1
+                    """,
+                    (self.max_attempts, now - self.lease_seconds)
+                ).fetchone()
+                if row is None:
+                    self._connection.execute("COMMIT")
+                    return None
+                self._connection.execute(
+                    """
+                    UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                        heartbeat = ?, updated = ?, error = NULL
+                    WHERE id = ?
+                    """,
+                    (worker, now, now, row["id"])
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return dict(row, status="running", worker=worker, attempts=row["attempts"] + 1, heartbeat=now)
+
+    def heartbeat(self, job_id: int, stage: str = None):
+        now = time.time()
+        with self._lock, self._connection:
+            if stage is None:
+                self._connection.execute(
+                    "UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running'", (now, job_id)
+                )
+            else:
+                self._connection.execute(
+                    "UPDATE jobs SET heartbeat = ?, stage = ?, updated = ? WHERE id = ? AND status = 'running'",
+                    (now, stage, now, job_id)
+                )
+
+    def complete(self, job_id: int, worker: str, namespace: str = None) -> bool:
+        """
+        Mark a job done. Returns False, changing nothing, if `worker` no longer holds
+        it, e.g. its lease expired and another worker claimed the job meanwhile.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                """
+                UPDATE jobs SET status = 'done', stage = 'done', namespace = ?, updated = ?
+                WHERE id = ? AND worker = ? AND status = 'running'
+                """,
+                (namespace, now, job_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """
+        Record an error; the job goes back to pending until it runs out of attempts.
+        Like `complete`, only the worker holding the job can fail it.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                """
+                UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END,
+                    error = ?, updated = ?
+                WHERE id = ? AND worker = ? AND status = 'running'
+                """,
+                (self.max_attempts, error, now, job_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def retry_failed(self) -> int:
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, updated = ? WHERE status = 'failed'",
+                (time.time(),)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def jobs(self, status: str = None) -> List[dict]:
+        query, params = "SELECT * FROM jobs ORDER BY id", ()
+        if status is not None:
+            query, params = "SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,)
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def pending(self) -> bool:
+        """
+        Whether any job is left to run, including running ones that may still fail.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE attempts < ? AND status IN ('pending', 'running')",
+                (self.max_attempts,)
+            ).fetchone()
+        return row[0] > 0
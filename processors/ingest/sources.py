@@ -0,0 +1,54 @@
+import os
+from typing import List
+
+from loguru import logger
+
+VIDEO_EXTENSIONS = [".mp4", ".mkv", ".webm", ".mov", ".avi", ".m4v"]
+LIST_EXTENSIONS = [".txt", ".list"]
+
+
+def is_playlist(url: str) -> bool:
+    return "list=" in url or "/playlist" in url
+
+
+def playlist_urls(url: str) -> List[str]:
+    """
+    URLs of the entries of a playlist, listed without resolving each video.
+    """
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({'quiet': True, 'extract_flat': 'in_playlist'}) as ydl:
+        info_dict = ydl.extract_info(url, download=False)
+    entries = info_dict.get("entries") or []
+    return [entry.get("url") or entry.get("webpage_url") for entry in entries if entry]
+
+
+def expand_sources(sources: List[str]) -> List[str]:
+    """
+    Turn command-line sources into the list of videos to ingest.
+
+    A source is a directory (every video file below it), a .txt/.list file (one source
+    per line, blank lines and "#" comments skipped), a playlist URL (its entries), a
+    local video file or any other URL. Duplicates are dropped, order is kept.
+    """
+    urls = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in sorted(os.walk(source)):
+                urls.extend(
+                    os.path.abspath(os.path.join(root, name)) for name in sorted(files)
+                    if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+                )
+        elif os.path.isfile(source) and os.path.splitext(source)[1].lower() in LIST_EXTENSIONS:
+            with open(source) as file:
+                lines = [line.strip() for line in file]
+            urls.extend(expand_sources([line for line in lines if line and not line.startswith("#")]))
+        elif os.path.isfile(source):
+            urls.append(os.path.abspath(source))
+        elif is_playlist(source):
+            entries = playlist_urls(source)
+            logger.info(f"Playlist {source} has {len(entries)} videos")
+            urls.extend(entries)
+        else:
+            urls.append(source)
+    return list(dict.fromkeys(url for url in urls if url))
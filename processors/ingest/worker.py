@@ -0,0 +1,117 @@
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Callable
+
+from loguru import logger
+
+from processors.ingest.queue import JobQueue
+
+STAGES = ["download", "decode", "transcribe", "index"]
+
+
+class StageGate:
+    """
+    Caps how many jobs run each stage at once across worker processes, e.g. a few
+    downloads but many decodes. `limits` maps a stage to a multiprocessing semaphore;
+    stages without one are not limited. `on_enter` is called with the stage name
+    once its slot is acquired.
+    """
+
+    def __init__(self, limits: dict, on_enter: Callable[[str], None] = None):
+        self.limits = limits
+        self.on_enter = on_enter
+
+    @contextmanager
+    def __call__(self, stage: str):
+        semaphore = self.limits.get(stage)
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            if self.on_enter is not None:
+                self.on_enter(stage)
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+
+class _Heartbeat:
+    """Renews a job's lease in the background while a long stage runs."""
+
+    def __init__(self, queue: JobQueue, job_id: int, interval: float):
+        self.queue = queue
+        self.job_id = job_id
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.queue.heartbeat(self.job_id)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self._thread.join()
+        return False
+
+
+def run_worker(queue_path: str, config_kwargs: dict, limits: dict, lease_seconds: float, max_attempts: int):
+    """
+    Process jobs from the queue until none is left.
+
+    Each worker process loads its models once and reuses them for every video. Videos
+    go through the persistent ingestion cache, so a job that is picked up again after
+    a crash resumes from the stages it already completed.
+    """
+    from processors import Config, Retriever, VideoProcessor
+    from processors.processor import ConversationBot
+
+    worker_name = f"{socket.gethostname()}-{os.getpid()}"
+    queue = JobQueue(queue_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    current = {}
+    gate = StageGate(limits, on_enter=lambda stage: queue.heartbeat(current["id"], stage))
+
+    config = Config(**config_kwargs)
+    retriever = Retriever(config=config)
+    bot = ConversationBot(
+        config=config,
+        video_processor=VideoProcessor(config=config, stage_gate=gate),
+        retriever_processor=retriever,
+        database_path=config.output_folder,
+        llm=None
+    )
+
+    processed = 0
+    while True:
+        job = queue.claim(worker_name)
+        if job is None:
+            break
+        current["id"] = job["id"]
+        if not config.cache_dir:
+            # Without the ingestion cache nothing keeps videos apart on disk.
+            bot.database_path = os.path.join(config.output_folder, f"job_{job['id']}")
+            os.makedirs(bot.database_path, exist_ok=True)
+        logger.info(f"[{worker_name}] Ingesting {job['url']} (attempt {job['attempts']})")
+        try:
+            with _Heartbeat(queue, job["id"], interval=lease_seconds / 3):
+                bot.read_video(url=job["url"])
+                with gate("index"):
+                    bot.index()
+        except Exception as e:
+            logger.exception(f"[{worker_name}] Failed to ingest {job['url']}")
+            if not queue.fail(job["id"], worker_name, f"{type(e).__name__}: {e}"):
+                logger.warning(f"[{worker_name}] Job {job['id']} was taken over by another worker")
+        else:
+            if queue.complete(job["id"], worker_name, namespace=bot.namespace):
+                processed += 1
+            else:
+                logger.warning(f"[{worker_name}] Job {job['id']} was taken over by another worker")
+    queue.close()
+    logger.info(f"[{worker_name}] No jobs left, {processed} videos ingested")
+    return processed
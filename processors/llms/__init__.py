@@ -1 +1,5 @@
-from processors.llms.gpt4o import GPT4o
+from processors._lazy import lazy_module
+
+__getattr__, __dir__ = lazy_module(__name__, {
+    "GPT4o": "processors.llms.gpt4o",
+})
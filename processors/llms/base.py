@@ -1,4 +1,5 @@
 import abc
+from typing import AsyncIterator
 
 
 class LLM(abc.ABC):
@@ -10,5 +11,9 @@ class LLM(abc.ABC):
         pass
 
     @abc.abstractmethod
-    async def agenerate(self, prompt: str, images: list):
+    def agenerate(self, prompt: str, images: list) -> AsyncIterator[str]:
+        """
+        Stream the response as an async iterator of text deltas, yielded as soon as
+        the model produces them.
+        """
         pass
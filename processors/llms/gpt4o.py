@@ -7,7 +7,11 @@ class GPT4o(LLM):
     def __init__(self, config):
         super().__init__(config=config)
         self.model = OpenAIMultiModal(
-            model="gpt-4o", api_key=self.config.OPENAI_API_TOKEN, max_new_tokens=self.config.max_new_tokens
+            model="gpt-4o",
+            api_key=self.config.OPENAI_API_TOKEN,
+            api_base=self.config.openai_api_base,
+            max_new_tokens=self.config.max_new_tokens,
+            image_detail=self.config.image_detail
         )
 
     def generate(self, prompt: str, images: list):
@@ -18,4 +22,10 @@ class GPT4o(LLM):
         return response.text
 
     async def agenerate(self, prompt: str, images: list):
-        pass
+        stream = await self.model.astream_complete(
+            prompt=prompt,
+            image_documents=images
+        )
+        async for response in stream:
+            if response.delta:
+                yield response.delta
@@ -0,0 +1,152 @@
+import base64
+import io
+import math
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List
+
+from PIL import Image
+
+from processors.video.frame_store import frame_version, open_frame
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import ImageDocument
+
+
+class ImagePayloadOptimizer:
+    """
+    Shrink frames before they are sent to a multimodal LLM.
+
+    Frames are downscaled to what the model actually looks at for the requested
+    `detail` (OpenAI resizes "low" images to 512px and "high" images to a 768px
+    short side anyway), re-encoded as JPEG and, if `max_bytes` is set, re-compressed
+    until they fit. With `tile > 1`, runs of adjacent frames are packed into one
+    contact sheet so several moments cost a single image.
+
+    Frames are read from loose files or the video's frame store alike. Encoded
+    payloads are kept in an LRU keyed by file path and version, so a frame that is
+    retrieved again is not re-read or re-encoded.
+    """
+
+    MAX_SIZES = {
+        "low": (512, 512),
+        "high": (2048, 768),
+        "auto": (2048, 768),
+    }
+
+    def __init__(
+        self,
+        detail: str = "low",
+        max_bytes: int = None,
+        quality: int = 85,
+        tile: int = 1,
+        cache_size: int = 256
+    ):
+        self.detail = detail
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.tile = tile
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _target_size(self, width: int, height: int) -> tuple:
+        long_side, short_side = self.MAX_SIZES.get(self.detail, self.MAX_SIZES["auto"])
+        scale = min(1.0, long_side / max(width, height), short_side / min(width, height))
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _encode(self, image: Image.Image) -> bytes:
+        image = image.convert("RGB")
+        quality = self.quality
+        while True:
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            data = buffer.getvalue()
+            if self.max_bytes is None or len(data) <= self.max_bytes:
+                return data
+            if quality > 40:
+                quality -= 15
+            elif min(image.size) > 64:
+                image = image.resize((image.width * 3 // 4, image.height * 3 // 4), Image.LANCZOS)
+            else:
+                return data
+
+    def _cached(self, key: tuple, build) -> str:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        payload = build()
+        with self._lock:
+            self._cache[key] = payload
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return payload
+
+    @staticmethod
+    def _file_key(image_path: str) -> tuple:
+        return (image_path,) + frame_version(image_path)
+
+    def encode_file(self, image_path: str) -> str:
+        """
+        Return the optimized frame as base64-encoded JPEG.
+        """
+        def build():
+            with open_frame(image_path) as image:
+                image = image.resize(self._target_size(*image.size), Image.LANCZOS)
+                return base64.b64encode(self._encode(image)).decode("utf-8")
+
+        return self._cached(("frame", self.detail, self.max_bytes) + self._file_key(image_path), build)
+
+    def encode_contact_sheet(self, image_paths: List[str]) -> str:
+        """
+        Tile frames row by row into a single base64-encoded JPEG the size of one frame.
+        """
+        def build():
+            columns = math.ceil(math.sqrt(len(image_paths)))
+            rows = math.ceil(len(image_paths) / columns)
+            with open_frame(image_paths[0]) as first:
+                sheet_width, sheet_height = self._target_size(*first.size)
+            cell_width, cell_height = sheet_width // columns, sheet_height // rows
+            sheet = Image.new("RGB", (cell_width * columns, cell_height * rows))
+            for idx, image_path in enumerate(image_paths):
+                with open_frame(image_path) as image:
+                    image.thumbnail((cell_width, cell_height), Image.LANCZOS)
+                    sheet.paste(image, ((idx % columns) * cell_width, (idx // columns) * cell_height))
+            return base64.b64encode(self._encode(sheet)).decode("utf-8")
+
+        key = ("sheet", self.detail, self.max_bytes) + tuple(
+            part for image_path in image_paths for part in self._file_key(image_path)
+        )
+        return self._cached(key, build)
+
+    def prepare(self, image_documents: List["ImageDocument"]) -> List["ImageDocument"]:
+        """
+        Turn retrieved frame documents into optimized in-memory image documents.
+
+        With tiling enabled, frames are ordered by timestamp and every `tile`
+        consecutive frames become one contact sheet whose metadata lists the
+        timestamps of its cells in reading order.
+        """
+        from llama_index.core.schema import ImageDocument
+
+        if self.tile <= 1:
+            return [
+                ImageDocument(
+                    image=self.encode_file(document.image_path),
+                    image_mimetype="image/jpeg",
+                    metadata=document.metadata
+                )
+                for document in image_documents
+            ]
+
+        ordered = sorted(image_documents, key=lambda document: document.metadata.get("timestamp") or 0)
+        prepared = []
+        for start in range(0, len(ordered), self.tile):
+            group = ordered[start:start + self.tile]
+            prepared.append(ImageDocument(
+                image=self.encode_contact_sheet([document.image_path for document in group]),
+                image_mimetype="image/jpeg",
+                metadata={"timestamps": [document.metadata.get("timestamp") for document in group]}
+            ))
+        return prepared
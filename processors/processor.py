@@ -1,10 +1,20 @@
-from typing import TYPE_CHECKING
+import asyncio
+import shutil
+import time
+import uuid
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional
 
-from llama_index.core import SimpleDirectoryReader
+from processors.answer_cache import AnswerCache
+from processors.cache import IngestionCache, Manifest
+from processors.context import IMAGE_TOKENS, ContextBuilder, PackedContext, TokenCounter
+from processors.llms.images import ImagePayloadOptimizer
+from processors.telemetry import telemetry
 
 if TYPE_CHECKING:
     from processors.video import VideoProcessor
     from processors.retriever import Retriever
+    from processors.retriever.results import RetrievalResult
+    from processors.retriever.watermark import IndexWatermark
     from config import Config
     from processors.llms.base import LLM
 
@@ -19,11 +29,47 @@ class ConversationBot:
         llm: "LLM"
     ):
         self.config = config
+        if config.telemetry:
+            telemetry.configure(trace_path=config.trace_path, metrics_port=config.metrics_port)
         self.video_processor = video_processor
         self.retriever_processor = retriever_processor
         self.database_path = database_path
+        # A folder of this bot's own, e.g. a temporary one, that `close` deletes.
+        self.scratch_folder = None
         self.llm = llm
         self._metadata = ""
+        self.cache = None
+        if config.cache_dir:
+            self.cache = IngestionCache(
+                config.cache_dir, config.cache_max_bytes, on_evict=retriever_processor.drop_namespace
+            )
+        self.manifest = Manifest()
+        self.namespace = "default"
+        self._bot_id = uuid.uuid4().hex[:8]
+        self._cache_entry = None
+        self.image_optimizer = ImagePayloadOptimizer(
+            detail=config.image_detail,
+            max_bytes=config.image_max_bytes,
+            quality=config.image_quality,
+            tile=config.image_tile,
+            cache_size=config.image_cache_size
+        )
+        self.answer_cache = None
+        if config.answer_cache:
+            self.answer_cache = AnswerCache(
+                embed_fn=lambda query: self.retriever_processor.text_embed_model.get_query_embedding(query),
+                threshold=config.answer_cache_threshold,
+                ttl_seconds=config.answer_cache_ttl,
+                max_entries=config.answer_cache_size
+            )
+        # Per-conversation memory; in serving mode every session has its own bot.
+        self.context_builder = ContextBuilder(
+            TokenCounter(config.tokenizer_model),
+            budget=config.context_token_budget,
+            image_tokens=IMAGE_TOKENS.get(config.image_detail, IMAGE_TOKENS["auto"]),
+            images_per_payload=config.image_tile,
+            max_turns=config.history_turns
+        )
 
     @property
     def prompt(self):
@@ -37,7 +83,7 @@ Please ensure honesty and responsibility, refraining from any racist or sexist r
 Context: {context}
 
 Metadata for video: {metadata}
-
+{history}
 ---------------------
 
 Query: {query}
@@ -53,29 +99,215 @@ Answer:"""
         self._metadata = _metadata
 
     def read_video(self, url: str, ):
-        self.video_processor(url=url, output_folder=self.database_path)
-
-    def retrieve_relevant_info(self, query_str: str):
-        img, txt = self.retriever_processor.retrieve(query_str=query_str)
-        image_documents = SimpleDirectoryReader(
-            input_dir=self.database_path, input_files=img
-        ).load_data()
-        for idx, image in enumerate(image_documents):
-            image.metadata = {"timestamp": self.video_processor.get_timestamps(image_path=img[idx])}
-        return "".join(txt), image_documents
-
-    def index(self, data_path: str):
-        self.retriever_processor.index_data(output_folder=data_path)
-
-    def chat(self, user_message: str) -> str:
-        contexts, image_documents = self.retrieve_relevant_info(query_str=user_message)
-        context_str = "".join(contexts)
-        metadata_str = self.video_processor.metadata
-        prompt = self.prompt.format(
-            context=context_str,
+        video_id = self.video_processor.resolve_video_id(url)
+        self.namespace = IngestionCache.key(video_id, self.config.pipeline_params())
+        self._release_cache_entry()
+        if self.cache is not None:
+            self.database_path, self.manifest = self.cache.open(video_id, self.config.pipeline_params())
+            self._cache_entry = self.database_path
+        else:
+            # Nothing is shared without the cache, so the tables belong to this bot
+            # alone; another bot ingesting the same video must not drop them.
+            self.namespace = f"{self.namespace}_{self._bot_id}"
+            self.manifest = Manifest()
+        frame_sink = segment_sink = None
+        if not self.manifest.done("index"):
+            if self.config.progressive_indexing:
+                # Index frames and transcript chunks as they are produced, so questions
+                # can be answered about the start of the video while the rest is processed.
+                self.retriever_processor.begin_index(namespace=self.namespace)
+                frame_sink = lambda paths: self.retriever_processor.insert_frames(
+                    paths, self.video_processor.timestamps
+                )
+                segment_sink = self.retriever_processor.insert_segments
+            else:
+                # Embed frames while the rest of the video is still being decoded and transcribed.
+                frame_sink = self.retriever_processor.precompute_image_embeddings
+        self.video_processor(
+            url=url,
+            output_folder=self.database_path,
+            manifest=self.manifest,
+            frame_sink=frame_sink,
+            segment_sink=segment_sink
+        )
+
+    def _release_cache_entry(self):
+        if self._cache_entry is not None:
+            self.cache.unpin(self._cache_entry)
+            self._cache_entry = None
+
+    def close(self):
+        """
+        Release what this bot holds: its pin on the cached video, or without the cache
+        its private tables, plus its scratch folder and the retriever's threads.
+        """
+        self._release_cache_entry()
+        if self.cache is None and self.retriever_processor.namespace == self.namespace:
+            self.retriever_processor.drop_namespace(self.namespace)
+        self.retriever_processor.close()
+        if self.scratch_folder is not None:
+            shutil.rmtree(self.scratch_folder, ignore_errors=True)
+            self.scratch_folder = None
+
+    @property
+    def coverage(self) -> Optional["IndexWatermark"]:
+        """
+        How far the index of the current video reaches, None before indexing starts.
+        """
+        return self.retriever_processor.watermark
+
+    @property
+    def queryable(self) -> bool:
+        return self.coverage is not None and self.coverage.queryable
+
+    @property
+    def partial(self) -> bool:
+        return self.coverage is not None and not self.coverage.complete
+
+    def index(self, data_path: str = None):
+        data_path = data_path if data_path is not None else self.database_path
+        if self.manifest.done("index") and self.retriever_processor.has_namespace(self.namespace):
+            self.retriever_processor.load_index(namespace=self.namespace, output_folder=data_path)
+        elif self.partial and self.retriever_processor.namespace == self.namespace:
+            self.retriever_processor.finish_index(output_folder=data_path, timestamps=self.video_processor.timestamps)
+            self.manifest.complete("index", namespace=self.namespace)
+            if self.answer_cache is not None:
+                self.answer_cache.invalidate(self.namespace)
+        else:
+            self.retriever_processor.index_data(
+                output_folder=data_path,
+                namespace=self.namespace,
+                timestamps=self.video_processor.timestamps
+            )
+            self.manifest.complete("index", namespace=self.namespace)
+            if self.answer_cache is not None:
+                self.answer_cache.invalidate(self.namespace)
+        if self.cache is not None:
+            self.cache.evict(keep=data_path)
+
+    def build_prompt(self, user_message: str, contexts: str, metadata_str: str = None, history: str = "") -> str:
+        return self.prompt.format(
+            context="".join(contexts),
             query=user_message,
-            metadata=metadata_str
+            metadata=metadata_str if metadata_str is not None else self.video_processor.metadata,
+            history=f"\nConversation so far:\n{history}\n" if history else ""
         )
 
-        response = self.llm.generate(prompt=prompt, images=image_documents)
+    def pack(self, user_message: str, result: "RetrievalResult", metadata_str: str = None) -> PackedContext:
+        """
+        Pack the hits retrieved for `user_message` and the conversation so far into a
+        prompt within `Config.context_token_budget`.
+        """
+        metadata_str = metadata_str if metadata_str is not None else self.video_processor.metadata
+        if self.partial:
+            metadata_str = (
+                f"{metadata_str}\n{self.coverage.describe()} "
+                f"If the answer may be in the part that is not processed yet, say so."
+            )
+        packed = self.context_builder.build(
+            user_message, result,
+            lambda context, history: self.build_prompt(user_message, context, metadata_str, history)
+        )
+        telemetry.count("prompt_tokens", packed.tokens)
+        return packed
+
+    def prepare_prompt(self, user_message: str, metadata_str: str = None) -> tuple:
+        """
+        Retrieve for `user_message` and build the prompt, see `pack`.
+
+        Returns:
+        tuple: The prompt, the optimized image documents to send with it and the
+        PackedContext to `record` once the answer is known.
+        """
+        result = self.retriever_processor.retrieve(query_str=user_message)
+        packed = self.pack(user_message, result, metadata_str)
+        image_documents = self.image_optimizer.prepare([hit.document for hit in packed.images])
+        return packed.prompt, image_documents, packed
+
+    def sync_history(self, history: Optional[List] = None):
+        """
+        Follow the UI's chat history: an empty history (a new or cleared chat) starts a
+        new conversation. None leaves the conversation as it is.
+        """
+        if history is not None and not history:
+            self.context_builder.reset()
+
+    def _use_answer_cache(self) -> bool:
+        # Answers about a partly indexed video may change once the rest is indexed.
+        return self.answer_cache is not None and not self.partial
+
+    @staticmethod
+    def _count_request(prompt: str, image_documents: list):
+        telemetry.count("llm_requests")
+        telemetry.count("prompt_chars", len(prompt))
+        telemetry.count("images_sent", len(image_documents))
+
+    def chat(self, user_message: str, history: Optional[List] = None) -> str:
+        self.sync_history(history)
+        use_cache = self._use_answer_cache()
+        history_key = self.context_builder.history_key()
+        if use_cache:
+            cached = self.answer_cache.get(self.namespace, user_message, history_key)
+            if cached is not None:
+                self.context_builder.record(user_message, cached)
+                return cached
+
+        prompt, image_documents, packed = self.prepare_prompt(user_message)
+
+        with telemetry.span("llm_generate", prompt_chars=len(prompt), images=len(image_documents)) as span:
+            self._count_request(prompt, image_documents)
+            response = self.llm.generate(prompt=prompt, images=image_documents)
+            span.set(response_chars=len(response))
+        self.context_builder.record(user_message, response, packed)
+        if use_cache:
+            self.answer_cache.put(self.namespace, user_message, response, history_key)
         return response
+
+    async def achat(self, user_message: str, history: Optional[List] = None) -> AsyncIterator[str]:
+        """
+        Streaming variant of `chat` that yields the answer token by token.
+
+        Retrieval, prompt packing and image loading run in worker threads, so the event
+        loop stays free while the prompt is prepared. Once retrieval is done, every
+        retrieved frame is loaded and encoded in a thread of its own while the prompt
+        is packed; the frames that make it into the prompt are then taken from the
+        optimizer's cache.
+        """
+        self.sync_history(history)
+        use_cache = self._use_answer_cache()
+        history_key = self.context_builder.history_key()
+        if use_cache:
+            cached = await asyncio.to_thread(self.answer_cache.get, self.namespace, user_message, history_key)
+            if cached is not None:
+                self.context_builder.record(user_message, cached)
+                yield cached
+                return
+
+        result = await asyncio.to_thread(self.retriever_processor.retrieve, user_message)
+        encodings = []
+        if self.image_optimizer.tile <= 1:
+            # Contact sheets depend on which frames are packed, so they are built after.
+            encodings = [
+                asyncio.to_thread(self.image_optimizer.encode_file, hit.image_path) for hit in result.images
+            ]
+        packed, *_ = await asyncio.gather(
+            asyncio.to_thread(self.pack, user_message, result, self.video_processor.metadata), *encodings
+        )
+        image_documents = await asyncio.to_thread(
+            self.image_optimizer.prepare, [hit.document for hit in packed.images]
+        )
+        prompt = packed.prompt
+
+        tokens = []
+        with telemetry.span("llm_generate", prompt_chars=len(prompt), images=len(image_documents)) as span:
+            self._count_request(prompt, image_documents)
+            started = time.perf_counter()
+            async for token in self.llm.agenerate(prompt=prompt, images=image_documents):
+                if not tokens:
+                    span.set(first_token_seconds=time.perf_counter() - started)
+                tokens.append(token)
+                yield token
+            span.set(response_chars=sum(len(token) for token in tokens))
+        self.context_builder.record(user_message, "".join(tokens), packed)
+        if use_cache:
+            self.answer_cache.put(self.namespace, user_message, "".join(tokens), history_key)
@@ -0,0 +1,176 @@
+import importlib
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from loguru import logger
+
+from processors.config import model_id
+
+if TYPE_CHECKING:
+    from processors.config import Config
+
+# Modules that dominate import time, imported up front by `warm_up`.
+HEAVY_MODULES = [
+    "processors.video.processor",
+    "processors.retriever.processor",
+    "processors.llms.gpt4o",
+]
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of the heavy resources that every session can share: embedding
+    models, Whisper, LanceDB connections, embedding caches, LLM clients and image
+    payload caches.
+
+    Each resource is created once per key on first use. Loading one resource only
+    blocks callers waiting for that same resource. `warm_up` does the loading ahead
+    of time, in the background, and records how long each import and model took.
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.timings = {}
+        self._warm_up_thread = None
+
+    def get(self, key: tuple, factory: Callable[[], object]):
+        resource = self._resources.get(key)
+        if resource is not None:
+            return resource
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._resources:
+                self._resources[key] = factory()
+            return self._resources[key]
+
+    def embed_model(self, model):
+        from llama_index.core.embeddings.utils import resolve_embed_model
+
+        return self.get(("embed_model", model_id(model)), lambda: resolve_embed_model(model))
+
+    def lancedb(self, uri: str):
+        import lancedb
+
+        return self.get(("lancedb", uri), lambda: lancedb.connect(uri))
+
+    def embedding_cache(self, root: str, name: str):
+        from processors.retriever.embedding_cache import EmbeddingCache
+
+        return self.get(("embedding_cache", root, name), lambda: EmbeddingCache(root, name))
+
+    def transcriber(self, config: "Config"):
+        """
+        A `ChunkedTranscriber` whose worker pool (and the Whisper model in each worker)
+        lives as long as the process and is shared by every ingestion.
+        """
+        from processors.video.transcription import ChunkedTranscriber
+
+        key = (
+            "transcriber", config.asr_model, config.asr_chunk_seconds, config.asr_overlap_seconds,
+            config.asr_split_on_silence, config.asr_workers
+        )
+        return self.get(key, lambda: ChunkedTranscriber(
+            model=config.asr_model,
+            chunk_seconds=config.asr_chunk_seconds,
+            overlap_seconds=config.asr_overlap_seconds,
+            split_on_silence=config.asr_split_on_silence,
+            workers=config.asr_workers,
+            persistent=True
+        ))
+
+    def answer_cache(self, config: "Config"):
+        """
+        One answer cache for every session, so the same question about the same video
+        (entries are kept per namespace) is answered once for all users.
+        """
+        from processors.answer_cache import AnswerCache
+
+        key = (
+            "answer_cache", model_id(config.text_embed_model), config.answer_cache_threshold,
+            config.answer_cache_ttl, config.answer_cache_size
+        )
+        return self.get(key, lambda: AnswerCache(
+            embed_fn=lambda query: self.embed_model(config.text_embed_model).get_query_embedding(query),
+            threshold=config.answer_cache_threshold,
+            ttl_seconds=config.answer_cache_ttl,
+            max_entries=config.answer_cache_size
+        ))
+
+    def llm(self, config: "Config"):
+        from processors.llms import GPT4o
+
+        key = ("llm", config.OPENAI_API_TOKEN, config.openai_api_base, config.max_new_tokens, config.image_detail)
+        return self.get(key, lambda: GPT4o(config=config))
+
+    def image_optimizer(self, config: "Config"):
+        from processors.llms.images import ImagePayloadOptimizer
+
+        key = ("image_optimizer", config.image_detail, config.image_max_bytes, config.image_quality, config.image_tile)
+        return self.get(key, lambda: ImagePayloadOptimizer(
+            detail=config.image_detail,
+            max_bytes=config.image_max_bytes,
+            quality=config.image_quality,
+            tile=config.image_tile,
+            cache_size=config.image_cache_size
+        ))
+
+    def _timed(self, name: str, load: Callable[[], object]):
+        started = time.perf_counter()
+        try:
+            return load()
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed, it will be retried on first use: {e}")
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def preload(self, config: "Config"):
+        """
+        Import the heavy modules and load the models `config` will use, so the first
+        request does not pay for them. Failures are logged and left to the first use.
+        """
+        logger.info("Preloading shared models ...")
+        for module in HEAVY_MODULES:
+            self._timed(f"import {module}", lambda: importlib.import_module(module))
+        self._timed("lancedb", lambda: self.lancedb(config.lancedb_uri))
+        models = {model_id(model): model for model in (config.text_embed_model, config.image_embed_model)}
+        for name, model in models.items():
+            self._timed(f"embedding model {name}", lambda: self.embed_model(model))
+        self._timed(f"whisper {config.asr_model}", lambda: self.transcriber(config).start())
+        self._timed("llm client", lambda: self.llm(config))
+        logger.info("Shared models loaded")
+
+    def warm_up(self, config: "Config", background: bool = True) -> Optional[threading.Thread]:
+        """
+        Start `preload`, by default in a daemon thread, e.g. while the user is still
+        typing a URL. Code that needs a model meanwhile simply waits for it.
+        """
+        if self._warm_up_thread is not None:
+            return self._warm_up_thread
+        if not background:
+            self.preload(config)
+            return None
+        self._warm_up_thread = threading.Thread(target=self.preload, args=(config,), name="warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def wait_warm(self, timeout: float = None) -> bool:
+        if self._warm_up_thread is None:
+            return True
+        self._warm_up_thread.join(timeout)
+        return not self._warm_up_thread.is_alive()
+
+    def startup_report(self) -> str:
+        """
+        Time spent on each import and model load, slowest first, and the time since
+        the `processors` package was imported.
+        """
+        from processors import IMPORTED_AT
+
+        lines = [f"Startup report ({time.perf_counter() - IMPORTED_AT:.2f}s since import):"]
+        for name, seconds in sorted(self.timings.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"  {seconds:8.3f}s  {name}")
+        return "\n".join(lines)
@@ -1 +1,5 @@
-from .processor import Retriever
+from processors._lazy import lazy_module
+
+__getattr__, __dir__ = lazy_module(__name__, {
+    "Retriever": "processors.retriever.processor",
+})
@@ -0,0 +1,93 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from loguru import logger
+
+from processors.video.frame_store import frame_file, open_frame
+
+
+class BatchImageEmbedder:
+    """
+    Embed image files in fixed-size batches while the next batches are decoded.
+
+    Decoding and CLIP preprocessing run on a thread pool (PIL releases the GIL while
+    decoding), at most `prefetch_batches` batches ahead of the model, so memory is
+    bounded by `batch_size * prefetch_batches` preprocessed images. The model itself
+    runs one forward pass per batch using `torch_threads` intra-op threads.
+
+    Models without the CLIP internals (`_model`, `_preprocess`) fall back to their own
+    `get_image_embedding_batch`, still batch by batch; frames kept in a frame store are
+    handed to them as in-memory image files.
+    """
+
+    def __init__(
+        self,
+        embed_model,
+        batch_size: int = 32,
+        workers: int = 4,
+        torch_threads: int = None,
+        prefetch_batches: int = 2
+    ):
+        self.embed_model = embed_model
+        self.batch_size = batch_size
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self.prefetch_batches = prefetch_batches
+        self.stats = {}
+
+    @property
+    def supports_batching(self) -> bool:
+        return hasattr(self.embed_model, "_model") and hasattr(self.embed_model, "_preprocess")
+
+    def _load(self, image_path: str):
+        with open_frame(image_path) as image:
+            return self.embed_model._preprocess(image.convert("RGB"))
+
+    def _encode(self, images: list) -> List[List[float]]:
+        import torch
+
+        with torch.no_grad():
+            batch = torch.stack(images).to(self.embed_model._device)
+            return self.embed_model._model.encode_image(batch).float().tolist()
+
+    def embed(self, image_paths: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        batches = [image_paths[i:i + self.batch_size] for i in range(0, len(image_paths), self.batch_size)]
+
+        if not self.supports_batching:
+            embeddings = [
+                vector for batch in batches
+                for vector in self.embed_model.get_image_embedding_batch([frame_file(path) for path in batch])
+            ]
+        else:
+            import torch
+
+            if self.torch_threads:
+                torch.set_num_threads(self.torch_threads)
+
+            embeddings = []
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-decode") as pool:
+                pending = deque()
+                next_batch = 0
+                while next_batch < len(batches) and len(pending) < self.prefetch_batches:
+                    pending.append([pool.submit(self._load, path) for path in batches[next_batch]])
+                    next_batch += 1
+
+                while pending:
+                    images = [future.result() for future in pending.popleft()]
+                    if next_batch < len(batches):
+                        pending.append([pool.submit(self._load, path) for path in batches[next_batch]])
+                        next_batch += 1
+                    embeddings.extend(self._encode(images))
+
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            "images": len(image_paths),
+            "seconds": elapsed,
+            "images_per_second": len(image_paths) / elapsed if elapsed else 0.0,
+        }
+        logger.info(f"Embedded {len(image_paths)} images in {elapsed:.1f}s "
+                    f"({self.stats['images_per_second']:.1f} images/sec)")
+        return embeddings
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized.
+    fcntl = None
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, append-only store of embeddings for one model.
+
+    Vectors live in a flat float32 file that is memory-mapped for lookups, next to
+    a text file holding one content key per row. Keys are SHA-256 digests of the
+    bytes that were embedded, so the same frame or transcript window is only ever
+    embedded once per model, whatever video, fps or run it came from.
+
+    Several processes (e.g. batch ingestion workers) may share a cache: appends hold
+    an exclusive `flock` on the folder's lock file, and each process picks up the
+    keys the others appended before writing its own rows.
+    """
+
+    def __init__(self, root: str, model_name: str):
+        self.model_name = model_name
+        self.folder = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self.vectors_path = os.path.join(self.folder, "vectors.f32")
+        self.keys_path = os.path.join(self.folder, "keys.txt")
+        self.meta_path = os.path.join(self.folder, "meta.json")
+        self.lock_path = os.path.join(self.folder, "lock")
+        os.makedirs(self.folder, exist_ok=True)
+
+        self.dim = None
+        self.rows = {}
+        self.hits = 0
+        self.misses = 0
+        self._keys_offset = 0
+        self._key_rows = 0
+        self._matrix = None
+        self._lock = threading.Lock()
+        with self._exclusive():
+            self._sync()
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """
+        Catch up with rows appended by other processes. Must hold `_exclusive`.
+        """
+        if self.dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path) as file:
+                self.dim = json.load(file)["dim"]
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path) as file:
+                file.seek(self._keys_offset)
+                keys = file.read().split()
+                self._keys_offset = file.tell()
+            for key in keys:
+                self.rows[key] = self._key_rows
+                self._key_rows += 1
+            if keys:
+                self._matrix = None
+        # Vectors are written before keys, so a crash mid-append can only leave
+        # extra vector rows behind; drop them so rows and keys line up again.
+        if self._stored_rows() > self._key_rows:
+            os.truncate(self.vectors_path, self._key_rows * 4 * self.dim)
+            self._matrix = None
+
+    @staticmethod
+    def content_key(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _stored_rows(self) -> int:
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _vectors(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(self._stored_rows(), self.dim)
+            )
+        return self._matrix
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._vectors()[row]
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]):
+        if not keys:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._exclusive():
+            self._sync()
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                with open(self.meta_path, "w") as file:
+                    json.dump({"model": self.model_name, "dim": self.dim}, file)
+
+            with open(self.vectors_path, "ab") as file:
+                file.write(matrix.tobytes())
+            with open(self.keys_path, "a") as file:
+                file.write("".join(f"{key}\n" for key in keys))
+            # Read our own keys back, which assigns them the rows just written.
+            self._sync()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": len(self.rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
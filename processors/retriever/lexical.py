@@ -0,0 +1,103 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import TextNode
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def phrase_query(query: str) -> str:
+    """
+    Return the phrase of an exact-phrase query (wrapped in double quotes), else "".
+    """
+    query = query.strip()
+    if len(query) > 2 and query[0] == query[-1] == '"':
+        return query[1:-1].strip()
+    return ""
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 inverted index over transcript nodes.
+
+    Names, numbers and jargon that dense embeddings blur are matched verbatim here,
+    and a search costs a few dictionary lookups instead of an embedding call. Nodes
+    can be `add`ed as they are produced; term statistics are computed at query time,
+    so the scores are the same as for an index built from all of them at once.
+    """
+
+    def __init__(self, nodes: List["TextNode"] = None, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.nodes = []
+        self.postings = defaultdict(list)
+        self.lengths = []
+        self.avg_length = 0.0
+        self._normalized = []
+        self._total_length = 0
+        if nodes:
+            self.build(nodes)
+
+    def build(self, nodes: List["TextNode"]) -> "BM25Index":
+        self.nodes = []
+        self.postings = defaultdict(list)
+        self.lengths = []
+        self._normalized = []
+        self._total_length = 0
+        return self.add(nodes)
+
+    def add(self, nodes: List["TextNode"]) -> "BM25Index":
+        for node in nodes:
+            tokens = tokenize(node.text)
+            # Filled in before the postings that point at it, for searches running meanwhile.
+            self.lengths.append(len(tokens))
+            self._normalized.append(" ".join(tokens))
+            self.nodes.append(node)
+            self._total_length += len(tokens)
+            idx = len(self.nodes) - 1
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((idx, frequency))
+        self.avg_length = self._total_length / len(self.nodes) if self.nodes else 0.0
+        return self
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.nodes) - df + 0.5) / (df + 0.5))
+
+    def _ranked(self, query: str) -> List[Tuple[int, float]]:
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for idx, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / (self.avg_length or 1.0))
+                scores[idx] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple["TextNode", float]]:
+        return [(self.nodes[idx], score) for idx, score in self._ranked(query)[:top_k]]
+
+    def phrase_search(self, phrase: str, top_k: int = 10) -> List[Tuple["TextNode", float]]:
+        """
+        Return nodes containing `phrase` verbatim (case and punctuation insensitive),
+        ranked by BM25 score.
+        """
+        normalized = " ".join(tokenize(phrase))
+        if not normalized:
+            return []
+        return [
+            (self.nodes[idx], score) for idx, score in self._ranked(phrase)
+            if f" {normalized} " in f" {self._normalized[idx]} "
+        ][:top_k]
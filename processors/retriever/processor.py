@@ -1,50 +1,668 @@
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+import lancedb
 from loguru import logger
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, List, Optional
 
-from llama_index.core import SimpleDirectoryReader, StorageContext
+from llama_index.core import StorageContext
+from llama_index.core.embeddings.utils import resolve_embed_model
 from llama_index.core.indices import MultiModalVectorStoreIndex
-from llama_index.core.response.notebook_utils import display_source_node
-from llama_index.core.schema import ImageNode
+from llama_index.core.schema import ImageDocument, ImageNode, MetadataMode, TextNode
 from llama_index.vector_stores.lancedb import LanceDBVectorStore
 
+from processors.config import model_id
+from processors.retriever.embedding import BatchImageEmbedder
+from processors.retriever.embedding_cache import EmbeddingCache
+from processors.retriever.lexical import BM25Index, phrase_query
+from processors.retriever.results import ImageHit, RetrievalResult, TextHit
+from processors.retriever.time_index import TimeIndex
+from processors.retriever.transcript import build_transcript_nodes, load_segments
+from processors.retriever.watermark import IndexWatermark
+from processors.telemetry import telemetry
+from processors.video.frame_store import frame_content, open_store
+
 if TYPE_CHECKING:
     from processors.config import Config
+    from processors.registry import ModelRegistry
+
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".webp"]
 
 
 class Retriever:
-    def __init__(self, config: "Config"):
-        text_store = LanceDBVectorStore(uri="lancedb", table_name="text_collection")
-        image_store = LanceDBVectorStore(uri="lancedb", table_name="image_collection")
+    """
+    Multi-modal retriever over a library of videos.
+
+    All videos share one LanceDB database (`Config.lancedb_uri`), but every video is
+    indexed into its own pair of tables, `text_<namespace>` and `image_<namespace>`,
+    so a query only ever scans the rows of the video being discussed. Tables that
+    grow past `Config.ann_index_threshold` rows get an IVF-PQ index.
+
+    Transcript windows are also kept in an in-memory BM25 index. With
+    `Config.hybrid_search`, lexical and vector hits are merged by reciprocal rank
+    fusion; exact-phrase queries can skip the vector search altogether.
+
+    With a `registry`, models, the database connection and embedding caches are
+    shared with every other retriever of the process; only the per-video state
+    (current namespace, index, lexical index) belongs to this instance.
+
+    An index can also be built progressively: `begin_index` starts an empty one, the
+    `insert_*` methods add frames and transcript windows while the video is still
+    being processed, and `finish_index` adds whatever is left. In the meantime the
+    `watermark` tells how far into the video retrieval reaches.
+    """
+
+    def __init__(self, config: "Config", registry: "ModelRegistry" = None):
+        self.config = config
+        self.registry = registry
+        self.db = registry.lancedb(config.lancedb_uri) if registry is not None else lancedb.connect(config.lancedb_uri)
+        self.namespace = None
+        self.text_store = None
+        self.image_store = None
+        self.storage_context = None
+        self.retriever_engine = None
+        self._text_embed_model = None
+        self._image_embed_model = None
+        self._embedding_caches = {}
+        self.image_embedding_stats = {}
+        self._precomputed_images = {}
+        self._image_documents = OrderedDict()
+        self.lexical_index = BM25Index()
+        self.time_index = None
+        self.watermark = None
+        self._index = None
+        self._indexed_frames = set()
+        self._indexed_texts = {}
+        self._segments = []
+        self._timestamps = {}
+        self._waiting_frames = []
+        self._contiguous_frames = 0
+        self._index_lock = threading.RLock()
+        self._search_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lexical")
+
+    def close(self):
+        """
+        Stop the lexical search thread. The retriever must not be queried afterwards.
+        """
+        self._search_pool.shutdown(wait=False)
+
+    @staticmethod
+    def table_names(namespace: str) -> tuple:
+        return f"text_{namespace}", f"image_{namespace}"
+
+    def _open_table(self, table_name: str):
+        """
+        The table, or None if it does not exist. `db.table_names()` lists only the
+        first 10 tables, so it cannot be used to look one up in a growing library.
+        """
+        try:
+            return self.db.open_table(table_name)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _vector_store(self, table_name: str) -> LanceDBVectorStore:
+        return LanceDBVectorStore(
+            uri=self.config.lancedb_uri,
+            # The (possibly shared) connection of this retriever, not a new one per table.
+            connection=self.db,
+            table_name=table_name,
+            # Passed in, or the store would look it up in `table_names()` and miss it.
+            table=self._open_table(table_name),
+            nprobes=self.config.ann_nprobes,
+            refine_factor=self.config.ann_refine_factor,
+        )
+
+    @staticmethod
+    def _append_to(store: LanceDBVectorStore):
+        """
+        Make later inserts add rows to the store's table, once it exists. The store uses
+        one `mode` both to create its table, which only accepts "create" or "overwrite",
+        and to add to it, so with the default "overwrite" every progressive insert would
+        replace the rows inserted before it.
+        """
+        store.mode = "append"
+
+    def use_namespace(self, namespace: str):
+        """
+        Point the retriever at the tables of one video.
+        """
+        text_table, image_table = self.table_names(namespace)
+        self.namespace = namespace
+        self.text_store = self._vector_store(text_table)
+        self.image_store = self._vector_store(image_table)
         self.storage_context = StorageContext.from_defaults(
-            vector_store=text_store,
-            image_store=image_store
+            vector_store=self.text_store,
+            image_store=self.image_store
         )
-        self.retriever_engine = None
 
-    def index_data(self, output_folder: str):
-        logger.info("Indexing data ...")
-        documents = SimpleDirectoryReader(output_folder).load_data()
+    def has_namespace(self, namespace: str) -> bool:
+        """
+        Whether a video has tables to load. Either may be missing on its own, e.g. the
+        text table of a video without speech is never created.
+        """
+        return any(self._open_table(name) is not None for name in self.table_names(namespace))
+
+    def drop_namespace(self, namespace: str):
+        for name in self.table_names(namespace):
+            if self._open_table(name) is not None:
+                self.db.drop_table(name)
 
-        index = MultiModalVectorStoreIndex.from_documents(
-            documents,
-            storage_context=self.storage_context,
+    def build_ann_index(self, table_name: str):
+        """
+        Build an IVF-PQ index on a table once it holds enough rows to benefit.
+        Smaller tables are scanned exactly, which is faster than probing partitions.
+        """
+        table = self._open_table(table_name)
+        if table is None:
+            return
+        rows = table.count_rows()
+        if rows < self.config.ann_index_threshold:
+            return
+
+        dim = table.schema.field("vector").type.list_size
+        num_sub_vectors = next(n for n in (dim // 16, dim // 8, dim // 4, dim // 2, 1) if n and dim % n == 0)
+        num_partitions = max(1, min(self.config.ann_num_partitions, int(rows ** 0.5)))
+        logger.info(f"Building IVF-PQ index on {table_name} ({rows} rows, {num_partitions} partitions)")
+        table.create_index(
+            metric="cosine",
+            num_partitions=num_partitions,
+            num_sub_vectors=num_sub_vectors,
+            vector_column_name="vector",
+            replace=True,
+        )
+
+    @property
+    def text_embed_model(self):
+        if self._text_embed_model is None:
+            if self.registry is not None:
+                self._text_embed_model = self.registry.embed_model(self.config.text_embed_model)
+            else:
+                self._text_embed_model = resolve_embed_model(self.config.text_embed_model)
+        return self._text_embed_model
+
+    @property
+    def image_embed_model(self):
+        if self._image_embed_model is None:
+            if self.registry is not None:
+                self._image_embed_model = self.registry.embed_model(self.config.image_embed_model)
+            else:
+                self._image_embed_model = resolve_embed_model(self.config.image_embed_model)
+        return self._image_embed_model
+
+    def embedding_cache(self, model) -> Optional[EmbeddingCache]:
+        if not self.config.embedding_cache_dir:
+            return None
+        name = model_id(model)
+        if name not in self._embedding_caches:
+            if self.registry is not None:
+                cache = self.registry.embedding_cache(self.config.embedding_cache_dir, name)
+            else:
+                cache = EmbeddingCache(self.config.embedding_cache_dir, name)
+            self._embedding_caches[name] = cache
+        return self._embedding_caches[name]
+
+    def _embed_cached(self, nodes: list, keys: List[str], model, embed_fn: Callable[[list], list]):
+        """
+        Set `node.embedding` for every node, looking up the embedding cache (if enabled)
+        first and only calling `embed_fn` on the misses. Nodes with an embedding are not
+        re-embedded by the index.
+        """
+        cache = self.embedding_cache(model)
+        vectors = [cache.get(key) for key in keys] if cache is not None else [None] * len(nodes)
+        missing = [idx for idx, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = embed_fn([nodes[idx] for idx in missing])
+            if cache is not None:
+                cache.put_many([keys[idx] for idx in missing], computed)
+            for idx, vector in zip(missing, computed):
+                vectors[idx] = vector
+        for node, vector in zip(nodes, vectors):
+            node.embedding = [float(value) for value in vector]
+
+    def embed_images(self, image_nodes: List[ImageNode]):
+        pending = []
+        for node in image_nodes:
+            embedding = self._precomputed_images.pop(node.image_path, None)
+            if embedding is not None:
+                node.embedding = embedding
+            else:
+                pending.append(node)
+        if not pending:
+            return
+
+        image_keys = []
+        if self.embedding_cache(self.image_embed_model) is not None:
+            for node in pending:
+                image_keys.append(EmbeddingCache.content_key(frame_content(node.image_path)))
+        embedder = BatchImageEmbedder(
+            self.image_embed_model,
+            batch_size=self.config.embed_batch_size,
+            workers=self.config.embed_workers,
+            torch_threads=self.config.embed_torch_threads
         )
+        self._embed_cached(
+            pending, image_keys, self.image_embed_model,
+            lambda nodes: embedder.embed([node.image_path for node in nodes])
+        )
+        self.image_embedding_stats = embedder.stats
+
+    def embed_texts(self, text_nodes: List[TextNode]):
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in text_nodes]
+        text_keys = [EmbeddingCache.content_key(text.encode("utf-8")) for text in texts]
+        self._embed_cached(
+            text_nodes, text_keys, self.text_embed_model,
+            lambda nodes: self.text_embed_model.get_text_embedding_batch(
+                [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            )
+        )
+
+    def precompute_image_embeddings(self, image_paths: List[str]):
+        """
+        Embed frames ahead of `index_data`, typically while the rest of the video is
+        still being decoded. The next `index_data` picks these embeddings up instead
+        of computing them again.
+        """
+        nodes = [ImageDocument(image_path=image_path) for image_path in image_paths]
+        self.embed_images(nodes)
+        for node in nodes:
+            self._precomputed_images[node.image_path] = node.embedding
+
+    def embed_nodes(self, image_nodes: List[ImageNode], text_nodes: List[TextNode]):
+        self.embed_images(image_nodes)
+        self.embed_texts(text_nodes)
+        for stats in self.embedding_cache_stats():
+            logger.info(f"Embedding cache {stats['model']}: {stats['hits']} hits, {stats['misses']} misses")
+
+    def embedding_cache_stats(self) -> List[dict]:
+        return [cache.stats() for cache in self._embedding_caches.values()]
+
+    @staticmethod
+    def load_image_documents(output_folder: str, timestamps: dict = None) -> List[ImageDocument]:
+        """
+        List the frames in `output_folder` (or in its frame store) as ImageDocuments
+        without decoding them; pixels are only read once, by the embedder. Frame times
+        from `timestamps` (as produced by `VideoProcessor.video_to_images`) are stored
+        in the metadata, so retrieval returns them without another lookup.
+        """
+        store = open_store(output_folder)
+        if store is not None:
+            image_paths = [os.path.join(output_folder, name) for name in store.names()]
+        else:
+            image_paths = sorted(
+                entry.path for entry in os.scandir(output_folder)
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+            )
+        return [Retriever._frame_document(image_path, timestamps) for image_path in image_paths]
+
+    @staticmethod
+    def _frame_document(image_path: str, timestamps: dict = None) -> ImageDocument:
+        file_name = os.path.basename(image_path)
+        metadata = {"file_path": image_path, "file_name": file_name}
+        frame = (timestamps or {}).get(file_name, {})
+        for key in ("timestamp", "start", "end"):
+            if key in frame:
+                metadata[key] = frame[key]
+        return ImageDocument(image_path=image_path, metadata=metadata)
+
+    def _set_index(self, index: MultiModalVectorStoreIndex):
+        similarity_top_k = self.config.similarity_top_k
+        if self.config.hybrid_search:
+            # Fetch as many vector candidates as lexical ones, fusion keeps the top k.
+            similarity_top_k = max(similarity_top_k, self.config.lexical_top_k)
         self.retriever_engine = index.as_retriever(
-            similarity_top_k=3, image_similarity_top_k=3
+            similarity_top_k=similarity_top_k,
+            image_similarity_top_k=self.config.image_similarity_top_k
+        )
+
+    def begin_index(self, namespace: str = "default"):
+        """
+        Start an empty index for a video, replacing tables left by an earlier,
+        unfinished run. It is queryable right away and grows with every insert.
+        """
+        with self._index_lock:
+            self.drop_namespace(namespace)
+            self.use_namespace(namespace)
+            self.lexical_index = BM25Index()
+            self.time_index = None
+            self.watermark = IndexWatermark()
+            self._indexed_frames = set()
+            self._indexed_texts = {}
+            self._segments = []
+            self._timestamps = {}
+            self._waiting_frames = []
+            self._contiguous_frames = 0
+            self._index = MultiModalVectorStoreIndex(
+                nodes=[],
+                storage_context=self.storage_context,
+                embed_model=self.text_embed_model,
+                image_embed_model=self.image_embed_model,
+                # Only search the tables once they hold rows.
+                is_text_vector_store_empty=True,
+                is_image_vector_store_empty=True,
+            )
+            self._set_index(self._index)
+
+    @staticmethod
+    def _mark_empty_stores(index: MultiModalVectorStoreIndex, text_empty: bool, image_empty: bool):
+        """
+        Tell the index which stores to skip when searching. llama-index has no public
+        setter for these flags; it only ever sets them (an `insert_nodes` batch of one
+        kind marks the other store empty) and never clears them, which would hide every
+        vector hit, so they are kept in step with what the tables hold here.
+        """
+        index._is_text_vector_store_empty = text_empty
+        index._is_image_vector_store_empty = image_empty
+
+    def _sync_empty_flags(self):
+        self._mark_empty_stores(self._index, not self._indexed_texts, not self._indexed_frames)
+
+    def _insert_frames(self, image_documents: List[ImageDocument]):
+        image_documents = [document for document in image_documents if document.image_path not in self._indexed_frames]
+        if not image_documents:
+            return
+        self.embed_images([document for document in image_documents if document.embedding is None])
+        self._index.insert_nodes(image_documents)
+        self._append_to(self.image_store)
+        self._indexed_frames.update(document.image_path for document in image_documents)
+        self._sync_empty_flags()
+        self.watermark.frames += len(image_documents)
+        telemetry.count("nodes_indexed", len(image_documents), kind="image")
+
+    def _insert_texts(self, text_nodes: List[TextNode]):
+        text_nodes = [node for node in text_nodes if node.id_ not in self._indexed_texts]
+        if not text_nodes:
+            return
+        self.embed_texts([node for node in text_nodes if node.embedding is None])
+        self._index.insert_nodes(text_nodes)
+        self._append_to(self.text_store)
+        self._indexed_texts.update((node.id_, node) for node in text_nodes)
+        self._sync_empty_flags()
+        self.lexical_index.add(text_nodes)
+        self.watermark.text_nodes = len(self._indexed_texts)
+        telemetry.count("nodes_indexed", len(text_nodes), kind="text")
+
+    def insert_frames(self, image_paths: List[str], timestamps: dict = None):
+        """
+        Add frames to the index started by `begin_index`, e.g. from a frame sink while
+        the rest of the video is still being decoded.
+        """
+        with self._index_lock:
+            self._timestamps = timestamps or {}
+            frames = list(self._timestamps.values())
+            # With keyframes, the range of the newest kept frame grows with every frame
+            # dropped after it, so it waits until the next keyframe or `finish_index`
+            # fixes its end.
+            growing = frames[-1]["filename"] if frames and "end" in frames[-1] else None
+            self._waiting_frames.extend(image_paths)
+            ready = [image_path for image_path in self._waiting_frames if image_path != growing]
+            self._waiting_frames = [image_path for image_path in self._waiting_frames if image_path == growing]
+            self._insert_frames([self._frame_document(image_path, timestamps) for image_path in ready])
+            self._advance_frame_watermark(frames)
+            self._refresh_time_index()
+
+    def _advance_frame_watermark(self, frames: List[dict]):
+        # Frames are written, and so indexed, out of order: only the prefix of the video
+        # without gaps counts as covered.
+        while self._contiguous_frames < len(frames):
+            frame = frames[self._contiguous_frames]
+            if frame["filename"] not in self._indexed_frames:
+                break
+            self.watermark.frame_seconds = frame.get("end", frame["timestamp"])
+            self._contiguous_frames += 1
+
+    def _refresh_time_index(self):
+        # Only frames that are indexed, and so readable, may be added to a hit's context.
+        indexed = {
+            name: frame for name, frame in list(self._timestamps.items()) if frame["filename"] in self._indexed_frames
+        }
+        self.time_index = TimeIndex.build(indexed, self._segments)
+
+    def insert_segments(self, segments: List[dict], covered_until: float):
+        """
+        Add the transcript of the audio up to `covered_until` seconds. Only windows
+        that later speech cannot change any more are indexed; the last one waits for
+        the next chunk or `finish_index`.
+        """
+        with self._index_lock:
+            self._segments.extend(segments)
+            if self._segments:
+                last_start = self._segments[-1]["start"]
+                self._insert_texts([
+                    node for node in build_transcript_nodes(
+                        self._segments,
+                        window_seconds=self.config.transcript_window_seconds,
+                        stride_seconds=self.config.transcript_stride_seconds
+                    )
+                    if node.metadata["end"] <= last_start
+                ])
+            self.watermark.transcript_seconds = max(self.watermark.transcript_seconds, covered_until)
+            self._refresh_time_index()
+
+    def finish_index(self, output_folder: str, timestamps: dict = None):
+        """
+        Index every frame and transcript window in `output_folder` not inserted yet,
+        then build the lexical, time and ANN indexes of the finished video.
+        """
+        with telemetry.span("index_data", namespace=self.namespace) as span, self._index_lock:
+            logger.info("Indexing data ...")
+            inserted_early = len(self._indexed_frames) + len(self._indexed_texts)
+            image_documents = self.load_image_documents(output_folder, timestamps=timestamps)
+            segments = load_segments(output_folder)
+            text_nodes = build_transcript_nodes(
+                segments,
+                window_seconds=self.config.transcript_window_seconds,
+                stride_seconds=self.config.transcript_stride_seconds
+            )
+            image_documents = [
+                document for document in image_documents if document.image_path not in self._indexed_frames
+            ]
+            self.embed_nodes(image_documents, [node for node in text_nodes if node.id_ not in self._indexed_texts])
+            self._insert_frames(image_documents)
+            self._insert_texts(text_nodes)
+            self._waiting_frames = []
+            span.set(images=len(self._indexed_frames), texts=len(self._indexed_texts), inserted_early=inserted_early)
+
+            self.time_index = self._load_time_index(output_folder, timestamps, segments)
+            for table_name in self.table_names(self.namespace):
+                self.build_ann_index(table_name)
+            self._segments = segments
+            self.watermark.frame_seconds = max(
+                [self.watermark.frame_seconds] +
+                [document.metadata.get("end", document.metadata.get("timestamp", 0.0)) for document in image_documents]
+            )
+            self.watermark.transcript_seconds = max(
+                [self.watermark.transcript_seconds] + [segment["end"] for segment in segments]
+            )
+            self.watermark.complete = True
+
+    def index_data(self, output_folder: str, namespace: str = "default", timestamps: dict = None):
+        self.begin_index(namespace)
+        self.finish_index(output_folder, timestamps=timestamps)
+
+    def load_index(self, namespace: str, output_folder: str = None):
+        """
+        Reopen the tables of a video indexed earlier without embedding anything.
+        The lexical and time indexes are rebuilt from `output_folder`, if given.
+        """
+        logger.info(f"Loading index {namespace} ...")
+        self.use_namespace(namespace)
+        self.lexical_index = BM25Index()
+        self.time_index = None
+        self.watermark = IndexWatermark(complete=True)
+        if output_folder is not None:
+            segments = load_segments(output_folder)
+            self.lexical_index.build(build_transcript_nodes(
+                segments,
+                window_seconds=self.config.transcript_window_seconds,
+                stride_seconds=self.config.transcript_stride_seconds
+            ))
+            self.time_index = self._load_time_index(output_folder, segments=segments)
+        index = MultiModalVectorStoreIndex.from_vector_store(
+            vector_store=self.text_store,
+            image_vector_store=self.image_store,
+            embed_model=self.text_embed_model,
+            image_embed_model=self.image_embed_model,
+        )
+        text_table, image_table = self.table_names(namespace)
+        self._mark_empty_stores(
+            index,
+            text_empty=self._open_table(text_table) is None,
+            image_empty=self._open_table(image_table) is None
+        )
+        self._set_index(index)
+
+    @staticmethod
+    def _load_time_index(output_folder: str, timestamps: dict = None, segments: list = None) -> Optional[TimeIndex]:
+        """
+        Open the time index written at ingestion, or build one from what is at hand.
+        """
+        if os.path.exists(TimeIndex.path(output_folder)):
+            return TimeIndex.load(output_folder)
+        if timestamps or segments:
+            return TimeIndex.build(timestamps, segments)
+        return None
+
+    def _image_document(self, metadata: dict) -> ImageDocument:
+        """
+        Return the ImageDocument for a retrieved frame, reusing recently built ones.
+        """
+        image_path = metadata["file_path"]
+        document = self._image_documents.get(image_path)
+        if document is not None:
+            self._image_documents.move_to_end(image_path)
+            return document
+
+        document = ImageDocument(image_path=image_path, metadata=dict(metadata))
+        self._image_documents[image_path] = document
+        if len(self._image_documents) > self.config.retrieval_cache_size:
+            self._image_documents.popitem(last=False)
+        return document
+
+    @staticmethod
+    def _text_hit(node: TextNode, score: float) -> TextHit:
+        return TextHit(
+            text=node.text,
+            score=score,
+            start=node.metadata.get("start"),
+            end=node.metadata.get("end")
         )
 
-    def retrieve(self, query_str):
+    def _fuse(self, vector_hits: list, lexical_hits: list) -> List[TextHit]:
+        """
+        Reciprocal rank fusion: a window scores sum(1 / (rrf_k + rank)) over the
+        rankings it appears in, so agreement between both searches wins.
+        """
+        scores, nodes = {}, {}
+        for ranking in (vector_hits, lexical_hits):
+            for rank, (node, _) in enumerate(ranking, start=1):
+                scores[node.node_id] = scores.get(node.node_id, 0.0) + 1.0 / (self.config.rrf_k + rank)
+                nodes.setdefault(node.node_id, node)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.config.similarity_top_k]
+        return [self._text_hit(nodes[node_id], scores[node_id]) for node_id in ranked]
+
+    def expand(self, result: RetrievalResult, seconds: float, frames_per_hit: int = 1) -> RetrievalResult:
+        """
+        Grow every timed hit into the ±`seconds` around it using the time index: the
+        speech in that window replaces the matched transcript window, and up to
+        `frames_per_hit` frames nearest its centre are added. Overlapping windows are
+        merged, so neighbouring hits become one coherent passage. Passages keep the
+        rank of their best hit.
+        """
+        if self.time_index is None:
+            return result
+
+        windows = [
+            (hit.start - seconds, hit.end + seconds, rank, hit.score)
+            for rank, hit in enumerate(result.texts) if hit.start is not None
+        ] + [
+            (hit.timestamp - seconds, hit.timestamp + seconds, rank, None)
+            for rank, hit in enumerate(result.images) if hit.timestamp is not None
+        ]
+        merged = []
+        for start, end, rank, score in sorted(windows):
+            if merged and start <= merged[-1][1]:
+                previous = merged[-1]
+                # Frame windows have no score, and a score of 0.0 is still a score.
+                if previous[3] is not None and score is not None:
+                    score = max(previous[3], score)
+                elif score is None:
+                    score = previous[3]
+                merged[-1] = [previous[0], max(previous[1], end), min(previous[2], rank), score]
+            else:
+                merged.append([start, end, rank, score])
+        merged.sort(key=lambda window: window[2])
+
+        expanded = RetrievalResult(images=list(result.images))
+        seen_frames = {hit.image_path for hit in result.images}
+        for start, end, _, score in merged:
+            segments = self.time_index.segments_between(start, end)
+            if segments:
+                expanded.texts.append(TextHit(
+                    text=" ".join(segment["text"] for segment in segments),
+                    score=score,
+                    start=segments[0]["start"],
+                    end=segments[-1]["end"]
+                ))
+            centre = (start + end) / 2
+            frames = [frame for frame in self.time_index.frames_between(start, end) if frame[1] not in seen_frames]
+            for timestamp, image_path in sorted(frames, key=lambda frame: abs(frame[0] - centre))[:frames_per_hit]:
+                seen_frames.add(image_path)
+                metadata = {"file_path": image_path, "file_name": os.path.basename(image_path), "timestamp": timestamp}
+                expanded.images.append(ImageHit(
+                    image_path=image_path,
+                    document=self._image_document(metadata),
+                    timestamp=timestamp
+                ))
+        expanded.texts.extend(hit for hit in result.texts if hit.start is None)
+        return expanded
+
+    def retrieve(self, query_str: str) -> RetrievalResult:
+        with telemetry.span("retrieve") as span:
+            result = self._retrieve(query_str)
+            if self.config.context_window_seconds:
+                result = self.expand(result, self.config.context_window_seconds, self.config.context_window_frames)
+            span.set(texts=len(result.texts), images=len(result.images))
+            telemetry.count("retrieved", len(result.texts), kind="text")
+            telemetry.count("retrieved", len(result.images), kind="image")
+        return result
+
+    def _retrieve(self, query_str: str) -> RetrievalResult:
+        phrase = phrase_query(query_str) if self.config.lexical_fast_path else ""
+        if phrase and len(self.lexical_index):
+            hits = self.lexical_index.phrase_search(phrase, top_k=self.config.similarity_top_k)
+            if hits:
+                return RetrievalResult(texts=[self._text_hit(node, score) for node, score in hits])
+
+        lexical_future = None
+        if self.config.hybrid_search and len(self.lexical_index):
+            lexical_future = self._search_pool.submit(
+                self.lexical_index.search, query_str, self.config.lexical_top_k
+            )
         retrieval_results = self.retriever_engine.retrieve(query_str)
 
-        retrieved_image = []
-        retrieved_text = []
+        result = RetrievalResult()
+        vector_hits = []
         for res_node in retrieval_results:
-            if isinstance(res_node.node, ImageNode):
-                retrieved_image.append(res_node.node.metadata["file_path"])
+            metadata = res_node.node.metadata
+            # LanceDB rebuilds stored ImageDocuments as plain TextNodes, so frames are
+            # recognised by their file path, which transcript nodes never carry.
+            if isinstance(res_node.node, ImageNode) or "file_path" in metadata:
+                result.images.append(ImageHit(
+                    image_path=metadata["file_path"],
+                    document=self._image_document(metadata),
+                    score=res_node.score,
+                    timestamp=metadata.get("timestamp")
+                ))
             else:
-                display_source_node(res_node, source_length=200)
-                retrieved_text.append(res_node.text)
+                vector_hits.append((res_node.node, res_node.score))
 
-        return retrieved_image, retrieved_text
+        if lexical_future is not None:
+            result.texts = self._fuse(vector_hits, lexical_future.result())
+        else:
+            # Vector candidates are over-fetched for fusion; keep the top k without it too.
+            result.texts = [
+                self._text_hit(node, score) for node, score in vector_hits[:self.config.similarity_top_k]
+            ]
+        return result
@@ -0,0 +1,41 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional
+
+from processors.retriever.transcript import format_timestamp
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import ImageDocument
+
+
+@dataclass
+class TextHit:
+    text: str
+    score: Optional[float] = None
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+    def format(self) -> str:
+        if self.start is None:
+            return self.text
+        return f"[{format_timestamp(self.start)} - {format_timestamp(self.end)}] {self.text}"
+
+
+@dataclass
+class ImageHit:
+    image_path: str
+    document: "ImageDocument"
+    score: Optional[float] = None
+    timestamp: Optional[float] = None
+
+
+@dataclass
+class RetrievalResult:
+    images: List[ImageHit] = field(default_factory=list)
+    texts: List[TextHit] = field(default_factory=list)
+
+    def context_str(self) -> str:
+        return "\n".join(hit.format() for hit in self.texts)
+
+    @property
+    def image_documents(self) -> List["ImageDocument"]:
+        return [hit.document for hit in self.images]
@@ -0,0 +1,96 @@
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+TIME_INDEX_FILENAME = "time_index.npz"
+
+
+class TimeIndex:
+    """
+    Sorted arrays of frame times and transcript segment intervals for one video.
+
+    Range lookups are two binary searches. Segments are looked up through the running
+    maximum of their end times, which is non-decreasing even if segments overlap, so
+    `segments_between` stays O(log n + k).
+    """
+
+    def __init__(
+        self,
+        frame_times: np.ndarray,
+        frame_paths: np.ndarray,
+        segment_starts: np.ndarray,
+        segment_ends: np.ndarray,
+        segment_texts: np.ndarray
+    ):
+        self.frame_times = frame_times
+        self.frame_paths = frame_paths
+        self.segment_starts = segment_starts
+        self.segment_ends = segment_ends
+        self.segment_texts = segment_texts
+        self._max_ends = np.maximum.accumulate(segment_ends) if segment_ends.size else segment_ends
+
+    @classmethod
+    def build(cls, timestamps: dict, segments: List[dict]) -> "TimeIndex":
+        """
+        Parameters:
+        timestamps (dict): Frame file name -> {"filename": path, "timestamp": seconds, ...}.
+        segments (list): Transcript segments as {"start": float, "end": float, "text": str}.
+        """
+        frames = sorted(
+            (frame["timestamp"], frame["filename"]) for frame in (timestamps or {}).values()
+            if frame.get("timestamp") is not None
+        )
+        segments = sorted(segments or [], key=lambda segment: segment["start"])
+        return cls(
+            frame_times=np.array([time for time, _ in frames], dtype=np.float64),
+            frame_paths=np.array([path for _, path in frames], dtype=str),
+            segment_starts=np.array([segment["start"] for segment in segments], dtype=np.float64),
+            segment_ends=np.array([segment["end"] for segment in segments], dtype=np.float64),
+            segment_texts=np.array([segment["text"] for segment in segments], dtype=str),
+        )
+
+    @staticmethod
+    def path(output_folder: str) -> str:
+        return os.path.join(output_folder, TIME_INDEX_FILENAME)
+
+    def save(self, output_folder: str):
+        with open(self.path(output_folder), "wb") as file:
+            np.savez(
+                file,
+                frame_times=self.frame_times,
+                frame_paths=self.frame_paths,
+                segment_starts=self.segment_starts,
+                segment_ends=self.segment_ends,
+                segment_texts=self.segment_texts,
+            )
+
+    @classmethod
+    def load(cls, output_folder: str) -> "TimeIndex":
+        with np.load(cls.path(output_folder), allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    @property
+    def duration(self) -> float:
+        ends = [array[-1] for array in (self.frame_times, self._max_ends) if array.size]
+        return float(max(ends)) if ends else 0.0
+
+    def frames_between(self, start: float, end: float) -> List[Tuple[float, str]]:
+        lo = np.searchsorted(self.frame_times, start, side="left")
+        hi = np.searchsorted(self.frame_times, end, side="right")
+        return [(float(self.frame_times[idx]), str(self.frame_paths[idx])) for idx in range(lo, hi)]
+
+    def segments_between(self, start: float, end: float) -> List[dict]:
+        """
+        Segments overlapping [start, end], in order.
+        """
+        lo = np.searchsorted(self._max_ends, start, side="right")
+        hi = np.searchsorted(self.segment_starts, end, side="left")
+        return [
+            {
+                "start": float(self.segment_starts[idx]),
+                "end": float(self.segment_ends[idx]),
+                "text": str(self.segment_texts[idx]),
+            }
+            for idx in range(lo, hi) if self.segment_ends[idx] > start
+        ]
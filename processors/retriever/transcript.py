@@ -0,0 +1,75 @@
+import bisect
+import json
+import os
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import TextNode
+
+TRANSCRIPT_FILENAME = "transcript.json"
+
+
+def format_timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def save_segments(segments: List[dict], output_folder: str) -> str:
+    path = os.path.join(output_folder, TRANSCRIPT_FILENAME)
+    with open(path, "w") as file:
+        json.dump(segments, file)
+    return path
+
+
+def load_segments(output_folder: str) -> List[dict]:
+    path = os.path.join(output_folder, TRANSCRIPT_FILENAME)
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return json.load(file)
+
+
+def build_transcript_nodes(segments: List[dict], window_seconds: float, stride_seconds: float) -> List["TextNode"]:
+    """
+    Group timed transcript segments into sliding windows, one TextNode per window.
+
+    Parameters:
+    segments (list): Ordered segments as {"start": float, "end": float, "text": str}.
+    window_seconds (float): Length of each window.
+    stride_seconds (float): Distance between the starts of consecutive windows.
+
+    Returns:
+    list: TextNodes with `start`/`end` metadata, in seconds.
+    """
+    from llama_index.core.schema import TextNode
+
+    if not segments:
+        return []
+
+    starts = [segment["start"] for segment in segments]
+    nodes = []
+    last_members = None
+    lo = 0
+    window_start = 0.0
+    duration = segments[-1]["end"]
+    while window_start < duration:
+        window_end = window_start + window_seconds
+        while lo < len(segments) and segments[lo]["end"] <= window_start:
+            lo += 1
+        members = (lo, bisect.bisect_left(starts, window_end))
+        if members[1] > members[0] and members != last_members:
+            window = segments[members[0]:members[1]]
+            nodes.append(TextNode(
+                # Stable IDs let lexical and vector hits on the same window be fused.
+                id_=f"transcript-{members[0]}-{members[1]}",
+                text=" ".join(segment["text"] for segment in window),
+                metadata={"start": window[0]["start"], "end": window[-1]["end"]},
+                excluded_embed_metadata_keys=["start", "end"],
+                excluded_llm_metadata_keys=["start", "end"],
+            ))
+            last_members = members
+        window_start += stride_seconds
+    return nodes
@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+from processors.retriever.transcript import format_timestamp
+
+
+@dataclass
+class IndexWatermark:
+    """
+    How far into the video the index reaches while it is still being built: frames up
+    to `frame_seconds` and speech up to `transcript_seconds` can already be retrieved.
+    """
+    frames: int = 0
+    frame_seconds: float = 0.0
+    text_nodes: int = 0
+    transcript_seconds: float = 0.0
+    complete: bool = False
+
+    @property
+    def queryable(self) -> bool:
+        return self.complete or self.frames > 0 or self.text_nodes > 0
+
+    def describe(self) -> str:
+        if self.complete:
+            return "The whole video has been processed."
+        return (
+            f"The video is still being processed: frames are indexed up to "
+            f"{format_timestamp(self.frame_seconds)} and speech up to {format_timestamp(self.transcript_seconds)}."
+        )
@@ -0,0 +1,227 @@
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Optional
+
+from loguru import logger
+
+from processors.processor import ConversationBot
+
+if TYPE_CHECKING:
+    from processors.config import Config
+    from processors.registry import ModelRegistry
+
+
+class AdmissionError(RuntimeError):
+    """Raised when the server cannot take another ingestion right now."""
+
+
+@dataclass
+class IngestionStatus:
+    url: str
+    stage: str = "queued"
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    bot: Optional[ConversationBot] = field(default=None, repr=False)
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    # Rough share of the ingestion time spent before each stage starts.
+    PROGRESS = {"queued": 0.0, "download": 0.05, "decode": 0.2, "transcribe": 0.2, "index": 0.85, "ready": 1.0}
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def progress(self) -> float:
+        return self.PROGRESS.get(self.stage, 0.0)
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def finish(self, error: str = None):
+        self.error = error
+        self.stage = "failed" if error else "ready"
+        self.finished = time.time()
+        self._done.set()
+
+    def describe(self) -> str:
+        elapsed = (self.finished or time.time()) - self.submitted
+        if self.error:
+            return f"Failed after {elapsed:.0f}s: {self.error}"
+        if self.done:
+            return f"Video ready after {elapsed:.0f}s, ask away."
+        status = f"{self.stage.capitalize()} ... {self.progress:.0%} ({elapsed:.0f}s)"
+        if self.bot is not None and self.bot.queryable:
+            status += f". You can already ask about the processed part: {self.bot.coverage.describe()}"
+        return status
+
+
+@dataclass
+class Session:
+    bot: Optional[ConversationBot] = None
+    ingestion: Optional[IngestionStatus] = None
+    last_used: float = field(default_factory=time.time)
+    closed: bool = False
+
+
+class SessionManager:
+    """
+    Per-session bots over shared models, for serving several users from one process.
+
+    Every session gets its own lightweight `ConversationBot` bound to its video, built
+    from models held by the `registry`. Videos are ingested in a background pool of
+    `max_ingestions` threads; at most `max_pending` ingestions may be running or
+    queued, and further requests are refused with `AdmissionError` instead of piling
+    up. A session keeps answering about its previous video until the first part of
+    the new one is indexed. Bots are closed once they are replaced or their session
+    ends, see `ConversationBot.close`.
+    """
+
+    def __init__(
+        self,
+        registry: "ModelRegistry",
+        max_ingestions: int = 2,
+        max_pending: int = 8,
+        session_ttl: float = 3600
+    ):
+        self.registry = registry
+        self.max_pending = max_pending
+        self.session_ttl = session_ttl
+        self.sessions: Dict[str, Session] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_ingestions, thread_name_prefix="ingestion")
+        self._pending = 0
+        self._lock = threading.Lock()
+        # URL -> [lock, number of ingestions using it], dropped when unused.
+        self._video_locks = {}
+
+    def session(self, session_id: str) -> Session:
+        with self._lock:
+            session = self.sessions.setdefault(session_id, Session())
+            session.last_used = time.time()
+            return session
+
+    def bot(self, session_id: str) -> Optional[ConversationBot]:
+        session = self.session(session_id)
+        ingestion = session.ingestion
+        # With progressive indexing, a video can be queried before it is fully processed.
+        if ingestion is not None and not ingestion.error and ingestion.bot is not None and ingestion.bot.queryable:
+            return ingestion.bot
+        return session.bot
+
+    @staticmethod
+    def _close_session(session: Session):
+        # A running ingestion closes its bot itself when it finishes, see `_ingest`.
+        session.closed = True
+        if session.bot is not None:
+            session.bot.close()
+            session.bot = None
+
+    def close(self, session_id: str):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self._close_session(session)
+
+    def evict_idle(self):
+        cutoff = time.time() - self.session_ttl
+        evicted = []
+        with self._lock:
+            for session_id in [key for key, session in self.sessions.items() if session.last_used < cutoff]:
+                if self.sessions[session_id].ingestion is None or self.sessions[session_id].ingestion.done:
+                    evicted.append(self.sessions.pop(session_id))
+        for session in evicted:
+            self._close_session(session)
+
+    @contextmanager
+    def _video_lock(self, url: str):
+        """
+        Serialize ingestions of the same video, so it is processed once and the other
+        sessions then load it from the ingestion cache.
+        """
+        with self._lock:
+            entry = self._video_locks.setdefault(url, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._video_locks[url]
+
+    def build_bot(self, config: "Config", status: IngestionStatus = None) -> ConversationBot:
+        @contextmanager
+        def track(stage: str):
+            if status is not None:
+                status.stage = stage
+            yield
+
+        # Imported here so that importing this module, e.g. to start the app, stays fast.
+        from processors.retriever import Retriever
+        from processors.video import VideoProcessor
+
+        # Without an ingestion cache every bot needs a folder of its own.
+        scratch_folder = None if config.cache_dir else tempfile.mkdtemp(dir=config.output_folder)
+        bot = ConversationBot(
+            config=config,
+            video_processor=VideoProcessor(
+                config=config, transcriber=self.registry.transcriber(config), stage_gate=track
+            ),
+            retriever_processor=Retriever(config=config, registry=self.registry),
+            database_path=scratch_folder or config.output_folder,
+            llm=self.registry.llm(config)
+        )
+        bot.scratch_folder = scratch_folder
+        bot.image_optimizer = self.registry.image_optimizer(config)
+        if config.answer_cache:
+            bot.answer_cache = self.registry.answer_cache(config)
+        return bot
+
+    def _ingest(self, session: Session, status: IngestionStatus, config: "Config"):
+        bot = None
+        try:
+            bot = status.bot = self.build_bot(config, status)
+            with self._video_lock(status.url):
+                bot.read_video(url=status.url)
+                status.stage = "index"
+                bot.index()
+            with self._lock:
+                previous, session.bot = session.bot, bot
+                closed = session.closed
+            if previous is not None:
+                previous.close()
+            if closed:
+                session.bot = None
+                bot.close()
+            status.finish()
+        except Exception as e:
+            logger.exception(f"Ingestion of {status.url} failed")
+            if bot is not None:
+                bot.close()
+            status.finish(error=f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def ingest(self, session_id: str, url: str, config: "Config") -> IngestionStatus:
+        """
+        Start ingesting `url` for a session in the background and return its status.
+        """
+        session = self.session(session_id)
+        with self._lock:
+            if session.ingestion is not None and not session.ingestion.done:
+                raise AdmissionError("This session is already processing a video, please wait for it to finish.")
+            if self._pending >= self.max_pending:
+                raise AdmissionError(f"The server is busy processing {self._pending} videos, please try again later.")
+            self._pending += 1
+            status = IngestionStatus(url=url)
+            session.ingestion = status
+        self._executor.submit(self._ingest, session, status, config)
+        self.evict_idle()
+        return status
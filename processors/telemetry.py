@@ -0,0 +1,171 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from loguru import logger
+
+METRIC_PREFIX = "video_qa"
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.duration = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.telemetry._finish(self)
+        return False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class Telemetry:
+    """
+    Timed spans and counters for the ingestion and chat pipeline.
+
+    Spans are kept in a bounded buffer and written as a Chrome trace (open it in
+    Perfetto or chrome://tracing). Span durations and counters are also aggregated
+    for a Prometheus text endpoint. While disabled, `span` returns a shared no-op
+    object and `count` returns immediately, so instrumented code pays one attribute
+    check per call.
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = 100000):
+        self.enabled = enabled
+        self.trace_path = None
+        self._spans = deque(maxlen=max_spans)
+        self._durations = defaultdict(lambda: [0.0, 0])
+        self._counters = defaultdict(float)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._server = None
+        self._flush_registered = False
+
+    def configure(self, enabled: bool = True, trace_path: str = None, metrics_port: int = None):
+        """
+        Parameters:
+        enabled (bool): Record spans and counters.
+        trace_path (str): Write the trace to this JSON file on `flush` and at exit.
+        metrics_port (int): Serve Prometheus metrics on http://0.0.0.0:<port>/metrics.
+        """
+        self.enabled = enabled
+        self.trace_path = trace_path
+        if enabled and trace_path and not self._flush_registered:
+            atexit.register(self.flush)
+            self._flush_registered = True
+        if enabled and metrics_port and self._server is None:
+            self.serve_metrics(metrics_port)
+
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def count(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def _finish(self, span: Span):
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": round((span.start - self._origin) * 1e6, 1),
+            "dur": round(span.duration * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": span.attributes,
+        }
+        with self._lock:
+            self._spans.append(event)
+            totals = self._durations[span.name]
+            totals[0] += span.duration
+            totals[1] += 1
+
+    def trace(self) -> dict:
+        with self._lock:
+            return {"traceEvents": list(self._spans), "displayTimeUnit": "ms"}
+
+    def flush(self, path: str = None):
+        path = path or self.trace_path
+        if not path:
+            return
+        with open(path, "w") as file:
+            json.dump(self.trace(), file, default=str)
+        logger.info(f"Trace written to {path}")
+
+    def prometheus_text(self) -> str:
+        lines = [f"# TYPE {METRIC_PREFIX}_span_seconds summary"]
+        with self._lock:
+            durations = {name: list(totals) for name, totals in self._durations.items()}
+            counters = dict(self._counters)
+        for name, (seconds, calls) in sorted(durations.items()):
+            lines.append(f'{METRIC_PREFIX}_span_seconds_sum{{span="{name}"}} {seconds:.6f}')
+            lines.append(f'{METRIC_PREFIX}_span_seconds_count{{span="{name}"}} {calls}')
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter != name:
+                    continue
+                label_str = ",".join(f'{key}="{label}"' for key, label in labels)
+                label_str = f"{{{label_str}}}" if label_str else ""
+                lines.append(f"{METRIC_PREFIX}_{name}_total{label_str} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return self._server
+
+
+# Process-wide instance used by all processors; disabled until configured.
+telemetry = Telemetry()
@@ -1 +1,5 @@
-from .processor import VideoProcessor
+from processors._lazy import lazy_module
+
+__getattr__, __dir__ = lazy_module(__name__, {
+    "VideoProcessor": "processors.video.processor",
+})
@@ -0,0 +1,349 @@
+import io
+import json
+import mmap
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from processors.video.frames import FRAME_FORMATS, frame_filename
+
+FRAME_STORE_FILENAME = "frames.pack"
+FRAME_INDEX_FILENAME = "frames.pack.idx"
+FRAME_STORE_ENCODINGS = ("raw", "compressed")
+# Loose frame files, as written by `FrameWriter` or `FrameStore.materialize`.
+LOOSE_FRAME_PATTERN = re.compile(
+    r"frame_\d+\.(%s)" % "|".join(sorted({extension for _, extension in FRAME_FORMATS.values()}))
+)
+
+
+def _downscale(frame: np.ndarray, max_side: int = None) -> np.ndarray:
+    height, width = frame.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return frame
+    scale = max_side / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return np.asarray(Image.fromarray(frame).resize(size, Image.LANCZOS))
+
+
+class FrameStoreWriter:
+    """
+    Append frames to one container file per video instead of one image file each.
+
+    With `encoding="raw"` every frame is stored as a downscaled uint8 RGB array that
+    readers map without decoding; with "compressed" it is stored encoded in
+    `image_format`. Each record is described by one JSON line (name, offset, length,
+    shape) appended to a sidecar index, so both files only ever grow and frames can
+    be read while the video is still being written. The index starts with a random
+    generation id that tells the packs of successive runs apart.
+
+    `submit` has the same contract as `FrameWriter.submit`: it returns the path the
+    frame would have as a loose file, which is how frames are referred to everywhere
+    else, and `on_written` is called with that path once the frame is in the store.
+    Loose frame files already in the folder are deleted, since the store takes
+    precedence over them from now on.
+    """
+
+    def __init__(
+        self,
+        output_folder: str,
+        encoding: str = "raw",
+        image_format: str = "png",
+        quality: int = 90,
+        max_side: int = None,
+        workers: int = 4,
+        on_written: Callable[[str], None] = None
+    ):
+        if encoding not in FRAME_STORE_ENCODINGS:
+            raise ValueError(f"Unsupported frame store encoding: {encoding}")
+        if image_format.lower() not in FRAME_FORMATS:
+            raise ValueError(f"Unsupported frame format: {image_format}")
+        self.output_folder = output_folder
+        self.encoding = encoding
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.max_side = max_side
+        self.on_written = on_written
+        # A new run replaces whatever an interrupted one left behind, including
+        # frames materialized from its store.
+        forget_store(output_folder)
+        for name in os.listdir(output_folder):
+            if LOOSE_FRAME_PATTERN.fullmatch(name):
+                os.remove(os.path.join(output_folder, name))
+        self._data = open(FrameStore.path(output_folder), "wb")
+        self._index = open(FrameStore.index_path(output_folder), "w")
+        self._index.write(json.dumps({"generation": uuid.uuid4().hex}) + "\n")
+        self._index.flush()
+        self._append_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-store")
+        self._slots = threading.BoundedSemaphore(2 * workers)
+        self._futures = []
+
+    def _encode(self, frame: np.ndarray) -> bytes:
+        if self.encoding == "raw":
+            return np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+        pil_format, _ = FRAME_FORMATS[self.image_format]
+        params = {} if pil_format == "PNG" else {"quality": self.quality}
+        buffer = io.BytesIO()
+        Image.fromarray(frame).save(buffer, format=pil_format, **params)
+        return buffer.getvalue()
+
+    def _append(self, frame: np.ndarray, frame_path: str):
+        try:
+            frame = _downscale(frame, self.max_side)
+            data = self._encode(frame)
+            with self._append_lock:
+                offset = self._data.tell()
+                self._data.write(data)
+                self._data.flush()
+                record = {"name": os.path.basename(frame_path), "offset": offset, "length": len(data)}
+                if self.encoding == "raw":
+                    record["shape"] = list(frame.shape)
+                self._index.write(json.dumps(record) + "\n")
+                self._index.flush()
+            if self.on_written is not None:
+                self.on_written(frame_path)
+        finally:
+            self._slots.release()
+
+    def submit(self, index: int, frame: np.ndarray) -> str:
+        """
+        Queue a frame for the store and return its (virtual) path.
+        """
+        frame_path = os.path.join(self.output_folder, frame_filename(index, self.image_format))
+        self._slots.acquire()
+        self._futures.append(self._pool.submit(self._append, frame, frame_path))
+        return frame_path
+
+    def close(self):
+        """
+        Wait for every queued frame and re-raise the first encoding error.
+        """
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._pool.shutdown(wait=True)
+            self._futures = []
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FrameStore:
+    """
+    Read-only view of a frame container, memory-mapped so raw frames are returned as
+    numpy arrays over the mapping itself, without copying or decoding.
+
+    The index is re-read incrementally when a frame is not found, which makes frames
+    appended by a running `FrameStoreWriter` visible to readers in the same or other
+    processes.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.records: Dict[str, dict] = {}
+        self.generation = None
+        self._index_position = 0
+        self._mmap = None
+        self._mapped_size = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @staticmethod
+    def path(folder: str) -> str:
+        return os.path.join(folder, FRAME_STORE_FILENAME)
+
+    @staticmethod
+    def index_path(folder: str) -> str:
+        return os.path.join(folder, FRAME_INDEX_FILENAME)
+
+    @classmethod
+    def exists(cls, folder: str) -> bool:
+        return os.path.exists(cls.index_path(folder))
+
+    def refresh(self):
+        with self._lock:
+            with open(self.index_path(self.folder)) as file:
+                file.seek(self._index_position)
+                while True:
+                    line = file.readline()
+                    # A line without its newline is still being written.
+                    if not line.endswith("\n"):
+                        break
+                    record = json.loads(line)
+                    if "generation" in record:
+                        self.generation = record["generation"]
+                    else:
+                        self.records[record["name"]] = record
+                    self._index_position = file.tell()
+
+            size = os.path.getsize(self.path(self.folder))
+            if size > self._mapped_size:
+                with open(self.path(self.folder), "rb") as file:
+                    # Views over an older, shorter mapping stay valid; it is released
+                    # once they are garbage collected.
+                    self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mapped_size = size
+
+    def names(self) -> List[str]:
+        return sorted(self.records)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def record(self, name: str) -> dict:
+        """
+        The index entry of a frame (offset, length and, for raw frames, shape).
+        """
+        if name not in self.records:
+            self.refresh()
+        return self.records[name]
+
+    def view(self, name: str) -> memoryview:
+        """
+        The stored bytes of a frame, as a zero-copy view of the mapping.
+        """
+        record = self.record(name)
+        if record["offset"] + record["length"] > self._mapped_size:
+            self.refresh()
+        return memoryview(self._mmap)[record["offset"]:record["offset"] + record["length"]]
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        The frame as an RGB array; raw frames are a read-only view of the mapping.
+        """
+        record = self.record(name)
+        if "shape" in record:
+            return np.frombuffer(self.view(name), dtype=np.uint8).reshape(record["shape"])
+        with self.image(name) as image:
+            return np.asarray(image.convert("RGB"))
+
+    def image(self, name: str) -> Image.Image:
+        record = self.record(name)
+        if "shape" in record:
+            return Image.fromarray(self.array(name))
+        return Image.open(io.BytesIO(self.view(name)))
+
+    def encoded(self, name: str) -> bytes:
+        """
+        The frame as the contents of an image file: compressed frames as they are
+        stored, raw frames encoded in the format their name implies.
+        """
+        record = self.record(name)
+        if "shape" not in record:
+            return bytes(self.view(name))
+        pil_format = FRAME_FORMATS[os.path.splitext(name)[1].lstrip(".").lower()][0]
+        buffer = io.BytesIO()
+        self.image(name).save(buffer, format=pil_format)
+        return buffer.getvalue()
+
+    def materialize(self, name: str) -> str:
+        """
+        Write a frame out as a regular image file, for consumers that need a path, and
+        return that path. The next `FrameStoreWriter` on the folder deletes it.
+        """
+        path = os.path.join(self.folder, name)
+        if os.path.exists(path):
+            return path
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(self.encoded(name))
+        os.replace(temp_path, path)
+        return path
+
+
+_stores: Dict[str, FrameStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(folder: str) -> Optional[FrameStore]:
+    """
+    The shared `FrameStore` of a folder, or None if its frames are loose files.
+    """
+    folder = os.path.abspath(folder)
+    store = _stores.get(folder)
+    if store is None and FrameStore.exists(folder):
+        with _stores_lock:
+            store = _stores.setdefault(folder, FrameStore(folder))
+    return store
+
+
+def forget_store(folder: str):
+    with _stores_lock:
+        _stores.pop(os.path.abspath(folder), None)
+
+
+def _stored(frame_path: str) -> Optional[FrameStore]:
+    # The store is checked first: a loose file next to it is a materialized copy.
+    store = open_store(os.path.dirname(frame_path))
+    if store is None and not os.path.exists(frame_path):
+        raise FileNotFoundError(frame_path)
+    return store
+
+
+def open_frame(frame_path: str) -> Image.Image:
+    """
+    Open a frame by path, whether it is a loose file or inside the folder's store.
+    """
+    store = _stored(frame_path)
+    if store is None:
+        return Image.open(frame_path)
+    return store.image(os.path.basename(frame_path))
+
+
+def frame_content(frame_path: str) -> bytes:
+    """
+    The bytes a frame is kept as, for content hashing: the file of a loose frame,
+    the encoded image of a compressed stored one, or the uint8 RGB pixels of a raw
+    one. Use `frame_file` for something that can be opened as an image.
+    """
+    store = _stored(frame_path)
+    if store is None:
+        with open(frame_path, "rb") as file:
+            return file.read()
+    return bytes(store.view(os.path.basename(frame_path)))
+
+
+def frame_file(frame_path: str) -> Union[str, io.BytesIO]:
+    """
+    The frame as an image file without writing it to disk: the path of a loose frame,
+    or an in-memory file for a stored one.
+    """
+    store = _stored(frame_path)
+    if store is None:
+        return frame_path
+    return io.BytesIO(store.encoded(os.path.basename(frame_path)))
+
+
+def frame_version(frame_path: str) -> tuple:
+    """
+    Changes whenever the frame at a path does, for cache keys: the modification time
+    of a loose file, or the pack generation and offset of a stored frame, which never
+    changes once written. Every run writes a new generation, even when it reuses the
+    files (and so the inodes) of the previous one.
+    """
+    store = _stored(frame_path)
+    if store is None:
+        return (os.stat(frame_path).st_mtime_ns,)
+    return store.generation, store.record(os.path.basename(frame_path))["offset"]
+
+
+def materialize_frame(frame_path: str) -> str:
+    store = _stored(frame_path)
+    if store is None:
+        return frame_path
+    return store.materialize(os.path.basename(frame_path))
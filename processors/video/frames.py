@@ -0,0 +1,121 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Tuple
+
+import imageio_ffmpeg
+import numpy as np
+from PIL import Image
+
+FRAME_FORMATS = {
+    "png": ("PNG", "png"),
+    "jpeg": ("JPEG", "jpg"),
+    "jpg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+}
+
+
+def frame_filename(index: int, image_format: str = "png") -> str:
+    """
+    Build the file name of the `index`-th sampled frame, e.g. `frame_00012.png`.
+    """
+    _, extension = FRAME_FORMATS[image_format.lower()]
+    return f"frame_{index:05d}.{extension}"
+
+
+def iter_frames(video_path: str, fps: float) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Decode a video in one sequential pass, resampled to `fps` by ffmpeg.
+
+    The number of frames matches the old per-timestamp extraction, which sampled
+    `int(int(duration) * fps)` frames at `t / fps` seconds.
+
+    Parameters:
+    video_path (str): The path to the video file.
+    fps (float): The number of frames to sample per second of video.
+
+    Returns:
+    Iterator: Tuples of (frame index, frame time in seconds, RGB frame array).
+    """
+    reader = imageio_ffmpeg.read_frames(video_path, pix_fmt="rgb24", output_params=["-vf", f"fps={fps}"])
+    try:
+        meta = next(reader)
+        width, height = meta["size"]
+        max_frames = int(int(meta["duration"]) * fps)
+
+        for index, buffer in enumerate(reader):
+            if index >= max_frames:
+                break
+            frame = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+            yield index, index / fps, frame
+    finally:
+        reader.close()
+
+
+class FrameWriter:
+    """
+    Encode frames to disk on a thread pool.
+
+    At most `2 * workers` frames are queued at once, so memory stays bounded even
+    when decoding is faster than encoding. `on_written` is called from the encoding
+    thread with the path of every frame once it is on disk.
+    """
+
+    def __init__(
+        self,
+        output_folder: str,
+        image_format: str = "png",
+        quality: int = 90,
+        workers: int = 4,
+        on_written: Callable[[str], None] = None
+    ):
+        if image_format.lower() not in FRAME_FORMATS:
+            raise ValueError(f"Unsupported frame format: {image_format}")
+        self.output_folder = output_folder
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.on_written = on_written
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-writer")
+        self._slots = threading.BoundedSemaphore(2 * workers)
+        self._futures = []
+
+    @property
+    def save_params(self) -> dict:
+        pil_format, _ = FRAME_FORMATS[self.image_format]
+        if pil_format == "PNG":
+            return {"format": pil_format}
+        return {"format": pil_format, "quality": self.quality}
+
+    def _encode(self, frame: np.ndarray, frame_path: str):
+        try:
+            Image.fromarray(frame).save(frame_path, **self.save_params)
+            if self.on_written is not None:
+                self.on_written(frame_path)
+        finally:
+            self._slots.release()
+
+    def submit(self, index: int, frame: np.ndarray) -> str:
+        """
+        Queue a frame for encoding and return the path it will be written to.
+        """
+        frame_path = os.path.join(self.output_folder, frame_filename(index, self.image_format))
+        self._slots.acquire()
+        self._futures.append(self._pool.submit(self._encode, frame, frame_path))
+        return frame_path
+
+    def close(self):
+        """
+        Wait for every queued frame and re-raise the first encoding error.
+        """
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._pool.shutdown(wait=True)
+            self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,70 @@
+import numpy as np
+from PIL import Image
+
+
+class KeyframeSelector:
+    """
+    Drop sampled frames that are near-duplicates of the last kept frame.
+
+    Every frame is reduced to a tiny signature and compared against the signature
+    of the last kept frame, so the cost per frame is a thumbnail resize plus a few
+    vectorized NumPy operations. Supported methods:
+
+    - "histogram": L1 distance between normalized per-channel colour histograms.
+    - "phash": Hamming distance between 64-bit difference hashes.
+    - "pixel": mean squared difference between downscaled grayscale frames.
+
+    All distances are normalized to [0, 1]; a frame is kept when its distance to
+    the last kept frame is at least `threshold`.
+    """
+
+    DEFAULT_THRESHOLDS = {
+        "histogram": 0.25,
+        "phash": 0.15,
+        "pixel": 0.01,
+    }
+
+    def __init__(self, method: str = "histogram", threshold: float = None, bins: int = 32, size: int = 32):
+        if method not in self.DEFAULT_THRESHOLDS:
+            raise ValueError(f"Unsupported keyframe method: {method}")
+        self.method = method
+        self.threshold = threshold if threshold is not None else self.DEFAULT_THRESHOLDS[method]
+        self.bins = bins
+        self.size = size
+        self._last_signature = None
+
+    def _thumbnail(self, frame: np.ndarray, size: tuple, mode: str = "L") -> np.ndarray:
+        return np.asarray(Image.fromarray(frame).convert(mode).resize(size, Image.BILINEAR), dtype=np.float32)
+
+    def signature(self, frame: np.ndarray) -> np.ndarray:
+        if self.method == "histogram":
+            pixels = self._thumbnail(frame, (4 * self.size, 4 * self.size), mode="RGB").reshape(-1, 3)
+            hist = np.stack([
+                np.histogram(pixels[:, channel], bins=self.bins, range=(0, 256))[0]
+                for channel in range(3)
+            ]).astype(np.float32)
+            return hist / hist.sum(axis=1, keepdims=True)
+        if self.method == "phash":
+            pixels = self._thumbnail(frame, (9, 8))
+            return (pixels[:, 1:] > pixels[:, :-1]).ravel()
+        return self._thumbnail(frame, (self.size, self.size)) / 255.0
+
+    def distance(self, a: np.ndarray, b: np.ndarray) -> float:
+        if self.method == "histogram":
+            return float(np.abs(a - b).sum(axis=1).mean() / 2)
+        if self.method == "phash":
+            return float(np.count_nonzero(a != b) / a.size)
+        return float(np.mean((a - b) ** 2))
+
+    def is_keyframe(self, frame: np.ndarray) -> bool:
+        """
+        Return True if `frame` should be kept, updating the reference frame if so.
+        """
+        signature = self.signature(frame)
+        if self._last_signature is not None and self.distance(signature, self._last_signature) < self.threshold:
+            return False
+        self._last_signature = signature
+        return True
+
+    def reset(self):
+        self._last_signature = None
@@ -1,27 +1,72 @@
+import json
 import os
-from typing import TYPE_CHECKING
+import queue
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, ContextManager, List
 import tempfile
+import wave
 
+import imageio_ffmpeg
 from loguru import logger
-import yt_dlp
-from moviepy.editor import *
-import speech_recognition as sr
+
+from processors.cache import Manifest
+from processors.retriever.time_index import TimeIndex
+from processors.retriever.transcript import load_segments, save_segments
+from processors.telemetry import telemetry
+from processors.video.download import Downloader, LocalFileDownloader, YtDlpDownloader, sufficient_height
+from processors.video.frame_store import FrameStoreWriter
+from processors.video.frames import FrameWriter, frame_filename, iter_frames
+from processors.video.keyframes import KeyframeSelector
+from processors.video.transcription import ChunkedTranscriber, WHISPER_SAMPLE_RATE
 
 if TYPE_CHECKING:
     from processors.config import Config
 
+TIMESTAMPS_FILENAME = "timestamps.json"
+
 
 class VideoProcessor:
-    def __init__(self, config: "Config"):
+    def __init__(
+        self,
+        config: "Config",
+        downloader: "Downloader" = None,
+        transcriber=None,
+        stage_gate: Callable[[str], ContextManager] = None
+    ):
         self.config = config
+        # None picks a downloader per URL: local files are used in place, anything else
+        # goes through yt-dlp.
+        self.downloader = downloader
+        # Any object with `transcribe(audio_path) -> segments`; None uses a Whisper
+        # `ChunkedTranscriber` built from the config.
+        self.transcriber = transcriber
+        # Called with "download", "decode" or "transcribe" around each stage, e.g. to cap
+        # how many run at once across processes; None runs stages ungated.
+        self.stage_gate = stage_gate
+        # Set right after the download, so a video can be chatted about while it is
+        # still being decoded and transcribed.
+        self.metadata = ""
         self.timestamps = {}
+        self.keyframe_stats = {}
+        self.segments = []
 
     def get_timestamps(self, image_path: str) -> dict:
         image_name = os.path.split(image_path)[-1]
         return self.timestamps.get(image_name, {})
 
-    @staticmethod
-    def download_video(url, output_path):
+    def downloader_for(self, url: str) -> Downloader:
+        if self.downloader is not None:
+            return self.downloader
+        if os.path.isfile(url):
+            return LocalFileDownloader()
+        return YtDlpDownloader(
+            mode=self.config.download_mode,
+            max_height=sufficient_height(self.config.image_input_size)
+        )
+
+    def download_video(self, url, output_path):
         """
         Download a video from a given url and save it to the output path.
 
@@ -30,68 +75,179 @@ class VideoProcessor:
         output_path (str): The path to save the video to.
 
         Returns:
-        dict: A dictionary containing the metadata of the video.
-        """
-        try:
-            ydl_opts = {
-                'format': 'best',
-                'outtmpl': f'{output_path}/input_vid.%(ext)s',
-                'quiet': True
-            }
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info_dict = ydl.extract_info(url, download=True)
-                ext = info_dict.get("ext")
-                metadata = {
-                    "Author": info_dict.get('uploader'),
-                    "Title": info_dict.get('title'),
-                    "Views": info_dict.get('view_count')
-                }
-                metadata = "\n".join([f"{k}: {v}" for k, v in metadata.items()])
+        dict: The video metadata and the paths of the video and (if separate) audio files.
+        """
+        with telemetry.span("download_video", url=url) as span:
+            try:
+                result = self.downloader_for(url).download(url, output_path)
+            except Exception as e:
+                logger.error(f"Failed to download video. An error occurred: {e}")
+                span.set(error=type(e).__name__)
+                return None
+            if telemetry.enabled:
+                downloaded = sum(
+                    os.path.getsize(path) for path in (result["video_path"], result.get("audio_path")) if path
+                )
+                span.set(bytes=downloaded)
+                telemetry.count("bytes_downloaded", downloaded)
             logger.info("Video downloaded successfully.")
-            return metadata, f'{output_path}/input_vid.%(ext)s'.replace("%(ext)s", ext)
-        except Exception as e:
-            logger.error(f"Failed to download video. An error occurred: {e}")
-            return None
-
-    def video_to_images(self, video_path: str, output_folder: str):
-        try:
-            clip = VideoFileClip(video_path)
-            os.makedirs(output_folder, exist_ok=True)
-            fps = self.config.video_fps
-            duration = int(clip.duration)
-            timestamps = {}
-
-            for t in range(0, int(duration * fps)):
-                frame_time = t / fps
-                frame = clip.get_frame(frame_time)
-                frame_path = os.path.join(output_folder, f"frame_{t:05d}.png")
-                ImageClip(frame).save_frame(frame_path)
-                timestamps[f"frame_{t:05d}.png"] = {"filename": frame_path, "timestamp": frame_time}
-
-            logger.info("Frames extracted successfully.")
-            return timestamps
-        except Exception as e:
-            logger.error(f"Failed to extract frames. An error occurred: {e}")
-            return None
+            return result
+
+    def _seek_frames(self, video_path: str, fps: float):
+        from moviepy.editor import VideoFileClip
+
+        clip = VideoFileClip(video_path)
+        duration = int(clip.duration)
+        for t in range(0, int(duration * fps)):
+            frame_time = t / fps
+            yield t, frame_time, clip.get_frame(frame_time)
+
+    def _frame_writer(self, output_folder: str, on_frame: Callable[[str], None] = None):
+        if self.config.frame_store:
+            return FrameStoreWriter(
+                output_folder,
+                encoding=self.config.frame_store,
+                image_format=self.config.frame_format,
+                quality=self.config.frame_quality,
+                max_side=self.config.frame_store_max_side,
+                workers=self.config.frame_workers,
+                on_written=on_frame
+            )
+        return FrameWriter(
+            output_folder,
+            image_format=self.config.frame_format,
+            quality=self.config.frame_quality,
+            workers=self.config.frame_workers,
+            on_written=on_frame
+        )
+
+    def video_to_images(self, video_path: str, output_folder: str, on_frame: Callable[[str], None] = None):
+        with telemetry.span("video_to_images", fps=self.config.video_fps) as span:
+            try:
+                os.makedirs(output_folder, exist_ok=True)
+                fps = self.config.video_fps
+                # Shared while frames are extracted, so frame sinks can look up the
+                # time of every frame they are handed.
+                timestamps = self.timestamps = {}
+
+                if self.config.frame_extraction == "seek":
+                    frames = self._seek_frames(video_path, fps)
+                else:
+                    frames = iter_frames(video_path, fps)
+
+                selector = None
+                if self.config.keyframe_method:
+                    selector = KeyframeSelector(
+                        method=self.config.keyframe_method,
+                        threshold=self.config.keyframe_threshold
+                    )
+
+                sampled = 0
+                last_name = None
+                with self._frame_writer(output_folder, on_frame) as writer:
+                    for t, frame_time, frame in frames:
+                        sampled += 1
+                        if selector is not None and not selector.is_keyframe(frame):
+                            # Extend the time range covered by the last kept frame.
+                            timestamps[last_name]["end"] = frame_time + 1 / fps
+                            continue
+
+                        last_name = frame_filename(t, self.config.frame_format)
+                        timestamps[last_name] = {
+                            "filename": os.path.join(output_folder, last_name),
+                            "timestamp": frame_time
+                        }
+                        if selector is not None:
+                            timestamps[last_name]["start"] = frame_time
+                            timestamps[last_name]["end"] = frame_time + 1 / fps
+                        writer.submit(t, frame)
+
+                if selector is not None:
+                    kept = len(timestamps)
+                    self.keyframe_stats = {
+                        "sampled": sampled,
+                        "kept": kept,
+                        "reduction": 1 - kept / sampled if sampled else 0.0
+                    }
+                    logger.info(
+                        f"Kept {kept}/{sampled} frames as keyframes "
+                        f"({self.keyframe_stats['reduction']:.1%} reduction)."
+                    )
+
+                span.set(frames=len(timestamps), sampled=sampled)
+                telemetry.count("frames_written", len(timestamps))
+                logger.info("Frames extracted successfully.")
+                return timestamps
+            except Exception as e:
+                logger.error(f"Failed to extract frames. An error occurred: {e}")
+                span.set(error=type(e).__name__)
+                return None
 
     @staticmethod
     def video_to_audio(video_path, output_audio_path):
         """
         Convert a video to audio and save it to the output path.
+        The audio is written as 16 kHz mono, which is what Whisper consumes; only the
+        audio stream is demuxed and decoded.
 
         Parameters:
-        video_path (str): The path to the video file.
+        video_path (str): The path to the video or audio-only file.
         output_audio_path (str): The path to save the audio to.
 
         """
         logger.info("Start converting video to audio...")
-        clip = VideoFileClip(video_path)
-        audio = clip.audio
-        audio.write_audiofile(output_audio_path)
+        with telemetry.span("video_to_audio") as span:
+            subprocess.run(
+                [
+                    imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error", "-i", video_path,
+                    "-vn", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "-acodec", "pcm_s16le", output_audio_path
+                ],
+                check=True
+            )
+            if telemetry.enabled:
+                with wave.open(output_audio_path, "rb") as audio:
+                    seconds = audio.getnframes() / audio.getframerate()
+                span.set(audio_seconds=seconds)
+                telemetry.count("audio_seconds", seconds)
         logger.info("Convert video to audio successfully")
 
-    @staticmethod
-    def audio_to_text(audio_path):
+    def audio_to_segments(self, audio_path, on_segments: Callable[[List[dict], float], None] = None):
+        """
+        Transcribe an audio file in parallel chunks.
+
+        Parameters:
+        audio_path (str): The path to the audio file.
+        on_segments (callable): Called with the segments of every chunk as soon as it
+        is transcribed, see `ChunkedTranscriber.transcribe`. Custom transcribers only
+        deliver the whole transcript at the end.
+
+        Returns:
+        segments (list): Ordered segments as {"start": float, "end": float, "text": str}.
+
+        """
+        logger.info("Converting audio to text")
+        transcriber = self.transcriber or ChunkedTranscriber(
+            model=self.config.asr_model,
+            chunk_seconds=self.config.asr_chunk_seconds,
+            overlap_seconds=self.config.asr_overlap_seconds,
+            split_on_silence=self.config.asr_split_on_silence,
+            workers=self.config.asr_workers
+        )
+        with telemetry.span("audio_to_text") as span:
+            try:
+                if on_segments is not None and isinstance(transcriber, ChunkedTranscriber):
+                    segments = transcriber.transcribe(audio_path, on_chunk=self._guarded_sink(on_segments, "Segment"))
+                else:
+                    segments = transcriber.transcribe(audio_path)
+            except Exception as e:
+                logger.error(f"Speech recognition failed; {e}")
+                span.set(error=type(e).__name__)
+                return []
+            span.set(segments=len(segments))
+            telemetry.count("transcript_segments", len(segments))
+            return segments
+
+    def audio_to_text(self, audio_path):
         """
         Convert an audio file to text.
 
@@ -102,23 +258,106 @@ class VideoProcessor:
         test (str): The text recognized from the audio.
 
         """
-        recognizer = sr.Recognizer()
-        audio = sr.AudioFile(audio_path)
-        logger.info("Converting audio to text")
+        self.segments = self.audio_to_segments(audio_path)
+        return " ".join(segment["text"] for segment in self.segments)
 
-        with audio as source:
-            # Record the audio data
-            audio_data = recognizer.record(source)
+    def resolve_video_id(self, url: str) -> str:
+        """
+        Return a stable ID for a video: the extractor's ID for URLs, or a content
+        hash for local files. Nothing is downloaded.
+        """
+        return self.downloader_for(url).probe(url)
 
+    @staticmethod
+    def save_timestamps(timestamps: dict, output_folder: str):
+        with open(os.path.join(output_folder, TIMESTAMPS_FILENAME), "w") as file:
+            json.dump(timestamps, file)
+
+    @staticmethod
+    def load_timestamps(output_folder: str) -> dict:
+        with open(os.path.join(output_folder, TIMESTAMPS_FILENAME)) as file:
+            return json.load(file)
+
+    def _stage(self, name: str) -> ContextManager:
+        return self.stage_gate(name) if self.stage_gate is not None else nullcontext()
+
+    def _frames_stage(
+        self,
+        filepath: str,
+        output_folder: str,
+        output_frames_path: str,
+        manifest: "Manifest",
+        on_frame: Callable[[str], None] = None
+    ) -> dict:
+        if manifest.done("frames"):
+            return self.load_timestamps(output_folder)
+
+        with self._stage("decode"):
+            timestamps = self.video_to_images(filepath, output_frames_path, on_frame=on_frame)
+        if timestamps is None:
+            raise RuntimeError("Frame extraction failed")
+        self.save_timestamps(timestamps, output_folder)
+        manifest.complete("frames", count=len(timestamps), keyframe_stats=self.keyframe_stats)
+        return timestamps
+
+    def _transcript_stage(
+        self,
+        audio_source: str,
+        output_folder: str,
+        output_audio_path: str,
+        manifest: "Manifest",
+        on_segments: Callable[[List[dict], float], None] = None
+    ):
+        if manifest.done("transcript"):
+            return load_segments(output_folder)
+
+        with self._stage("transcribe"):
+            if not manifest.done("audio"):
+                self.video_to_audio(audio_source, output_audio_path)
+                manifest.complete("audio", audio_path=output_audio_path)
+            segments = self.audio_to_segments(output_audio_path, on_segments=on_segments)
+        save_segments(segments, output_folder)
+        manifest.complete("transcript", segments=len(segments))
+        logger.info("Text data saved to file")
+        return segments
+
+    @staticmethod
+    def _guarded_sink(sink: Callable, kind: str) -> Callable:
+        """
+        Wrap a sink so that its first failure is logged and it is not called again;
+        whatever it missed is picked up at index time.
+        """
+        failed = False
+
+        def guarded(*args):
+            nonlocal failed
+            if failed:
+                return
             try:
-                # Recognize the speech
-                text = recognizer.recognize_whisper(audio_data)
-            except sr.UnknownValueError:
-                logger.error("Speech recognition could not understand the audio.")
-            except sr.RequestError as e:
-                logger.error(f"Could not request results from service; {e}")
+                sink(*args)
+            except Exception as e:
+                logger.error(f"{kind} sink failed, the rest is left to indexing: {e}")
+                failed = True
 
-        return text
+        return guarded
+
+    def _drain_frames(self, frames_queue: queue.Queue, frame_sink: Callable[[List[str]], None]):
+        """
+        Hand frame paths from `frames_queue` to `frame_sink` in batches until a None
+        sentinel arrives. If the sink fails, the queue keeps being drained so frame
+        extraction never blocks on it; the frames are simply embedded at index time.
+        """
+        batch = []
+        frame_sink = self._guarded_sink(frame_sink, "Frame")
+        while True:
+            frame_path = frames_queue.get()
+            if frame_path is not None:
+                batch.append(frame_path)
+            if batch and (frame_path is None or len(batch) >= self.config.embed_batch_size):
+                frame_sink(batch)
+                batch = []
+            if frame_path is None:
+                return
 
     def process_video(
         self,
@@ -126,30 +365,89 @@ class VideoProcessor:
         output_folder: str,
         output_frames_path: str,
         output_audio_path: str,
+        manifest: "Manifest" = None,
+        frame_sink: Callable[[List[str]], None] = None,
+        audio_source: str = None,
+        segment_sink: Callable[[List[dict], float], None] = None
     ):
-        timestamps = self.video_to_images(filepath, output_frames_path)
-        self.video_to_audio(filepath, output_audio_path)
-        text_data = self.audio_to_text(output_audio_path)
+        """
+        Extract frames and transcribe the audio track, read from `audio_source` when the
+        audio was downloaded as a separate file.
 
-        with open(output_folder + "output_text.txt", "w") as file:
-            file.write(text_data)
-        logger.info("Text data saved to file")
+        With `Config.concurrent_stages`, frame extraction and audio demux + ASR run side
+        by side, and every frame written is passed on (in batches, through a bounded
+        queue) to `frame_sink` while extraction is still going, e.g. to embed it.
+        Transcribed chunks are passed to `segment_sink` in order as they are done.
+        """
+        manifest = manifest if manifest is not None else Manifest()
+        audio_source = audio_source if audio_source is not None else filepath
+
+        if not self.config.concurrent_stages:
+            timestamps = self._frames_stage(filepath, output_folder, output_frames_path, manifest)
+            self.segments = self._transcript_stage(
+                audio_source, output_folder, output_audio_path, manifest, on_segments=segment_sink
+            )
+            return timestamps
+
+        frames_queue = queue.Queue(maxsize=self.config.stage_queue_size)
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="ingest") as pool:
+            transcript = pool.submit(
+                self._transcript_stage, audio_source, output_folder, output_audio_path, manifest, segment_sink
+            )
+            sink = pool.submit(self._drain_frames, frames_queue, frame_sink) if frame_sink is not None else None
+            try:
+                timestamps = self._frames_stage(
+                    filepath, output_folder, output_frames_path, manifest,
+                    on_frame=frames_queue.put if sink is not None else None
+                )
+            finally:
+                if sink is not None:
+                    frames_queue.put(None)
+            self.segments = transcript.result()
+            if sink is not None:
+                sink.result()
         return timestamps
 
-    def __call__(self, url: str, output_folder: str):
+    def __call__(
+        self,
+        url: str,
+        output_folder: str,
+        manifest: "Manifest" = None,
+        frame_sink: Callable[[List[str]], None] = None,
+        segment_sink: Callable[[List[dict], float], None] = None
+    ):
+        """
+        Run the pipeline for a video. With a persisted `manifest`, stages completed by
+        an earlier run are loaded from `output_folder` instead of being recomputed.
+        Frames and transcript chunks are streamed to `frame_sink` and `segment_sink`
+        as they are produced, see `process_video`.
+        """
+        manifest = manifest if manifest is not None else Manifest()
         output_video_path = output_folder + "/video_data/"
         output_audio_path = output_folder + "/mixed_data/output_audio.wav"
         os.makedirs(output_video_path, exist_ok=True)
         os.makedirs(output_folder, exist_ok=True)
         os.makedirs(os.path.split(output_audio_path)[0], exist_ok=True)
 
-        metadata, filepath = self.download_video(url=url, output_path=output_video_path)
+        if not manifest.done("download"):
+            with self._stage("download"):
+                result = self.download_video(url=url, output_path=output_video_path)
+            if result is None:
+                raise RuntimeError(f"Failed to download video: {url}")
+            manifest.complete("download", **result)
+        download = manifest.get("download")
+        self.metadata, filepath = download["metadata"], download["video_path"]
+
         timestamps = self.process_video(
             filepath=filepath,
+            audio_source=download.get("audio_path") or filepath,
             output_folder=output_folder,
             output_frames_path=output_folder,
-            output_audio_path=output_audio_path
+            output_audio_path=output_audio_path,
+            manifest=manifest,
+            frame_sink=frame_sink,
+            segment_sink=segment_sink
         )
-        self.metadata = metadata
+        TimeIndex.build(timestamps, self.segments).save(output_folder)
         self.timestamps = timestamps
         logger.info("Process video done!")
@@ -0,0 +1,233 @@
+import math
+import multiprocessing
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple
+
+import numpy as np
+from loguru import logger
+
+WHISPER_SAMPLE_RATE = 16000
+SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+_worker_model = None
+_worker_model_name = None
+# Whisper installs per-call hooks on the model, so in-process transcriptions that share
+# the loaded model (e.g. several sessions of the web app) take turns.
+_model_lock = threading.RLock()
+
+
+def read_samples(source: wave.Wave_read, start: float, end: float) -> np.ndarray:
+    """
+    Read the [start, end) seconds of an open WAV file as mono float32 in [-1, 1].
+    Only the requested window is read from disk.
+    """
+    rate = source.getframerate()
+    first = max(0, int(start * rate))
+    count = max(0, min(source.getnframes(), int(end * rate)) - first)
+    source.setpos(first)
+    raw = source.readframes(count)
+
+    width = source.getsampwidth()
+    samples = np.frombuffer(raw, dtype=SAMPLE_DTYPES[width]).astype(np.float32)
+    if width == 1:
+        samples -= 128
+    samples /= float(2 ** (8 * width - 1))
+    channels = source.getnchannels()
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != WHISPER_SAMPLE_RATE and samples.size:
+        target = np.arange(0, samples.size / rate, 1 / WHISPER_SAMPLE_RATE)
+        samples = np.interp(target, np.arange(samples.size) / rate, samples).astype(np.float32)
+    return samples
+
+
+def plan_chunks(
+    audio_path: str,
+    chunk_seconds: float = 30.0,
+    split_on_silence: bool = True,
+    search_seconds: float = 5.0,
+    hop_seconds: float = 0.1
+) -> List[Tuple[float, float]]:
+    """
+    Split an audio file into consecutive [start, end) windows of at most `chunk_seconds`.
+
+    With `split_on_silence`, each boundary is moved back to the quietest `hop_seconds`
+    slice within `search_seconds` of the nominal boundary, so words are rarely cut in
+    half. Loudness is computed in one streaming pass and only one RMS value per hop
+    is kept in memory.
+    """
+    with wave.open(audio_path, "rb") as source:
+        duration = source.getnframes() / source.getframerate()
+        if not split_on_silence or duration <= chunk_seconds:
+            starts = np.arange(0, duration, chunk_seconds)
+            return [(float(s), float(min(s + chunk_seconds, duration))) for s in starts]
+
+        hop_frames = int(hop_seconds * source.getframerate())
+        width = source.getsampwidth()
+        rms = []
+        while True:
+            raw = source.readframes(hop_frames)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype=SAMPLE_DTYPES[width]).astype(np.float32)
+            rms.append(math.sqrt(float(np.mean(samples ** 2))) if samples.size else 0.0)
+        rms = np.asarray(rms)
+
+    chunks = []
+    start = 0.0
+    while start < duration:
+        nominal = start + chunk_seconds
+        if nominal >= duration:
+            chunks.append((start, duration))
+            break
+        lo = int(max(start + chunk_seconds / 2, nominal - search_seconds) / hop_seconds)
+        hi = max(lo + 1, int(nominal / hop_seconds))
+        cut = (lo + int(np.argmin(rms[lo:hi]))) * hop_seconds if lo < rms.size else nominal
+        chunks.append((start, cut))
+        start = cut
+    return chunks
+
+
+def _init_worker(model_name: str):
+    """
+    Load the Whisper model of this process, unless it is already loaded.
+    """
+    global _worker_model, _worker_model_name
+    with _model_lock:
+        if _worker_model is not None and _worker_model_name == model_name:
+            return
+        import whisper
+
+        _worker_model = whisper.load_model(model_name)
+        _worker_model_name = model_name
+
+
+def _transcribe_chunk(args: tuple) -> List[dict]:
+    """
+    Transcribe one chunk plus its overlap and keep the segments whose midpoint falls
+    inside the chunk itself, so overlapping chunks never emit the same speech twice.
+    """
+    import torch
+
+    audio_path, start, end, overlap, last = args
+    with wave.open(audio_path, "rb") as source:
+        offset = max(0.0, start - overlap)
+        samples = read_samples(source, offset, end + overlap)
+
+    if not samples.size:
+        return []
+    result = _worker_model.transcribe(samples, fp16=torch.cuda.is_available())
+
+    segments = []
+    for segment in result.get("segments", []):
+        seg_start = offset + segment["start"]
+        seg_end = offset + segment["end"]
+        middle = (seg_start + seg_end) / 2
+        if middle < start or (middle >= end and not last):
+            continue
+        text = segment["text"].strip()
+        if text:
+            segments.append({"start": round(seg_start, 3), "end": round(seg_end, 3), "text": text})
+    return segments
+
+
+class ChunkedTranscriber:
+    """
+    Transcribe long audio as independent chunks across a process pool.
+
+    Each worker loads the Whisper model once and reads only its own chunk from disk,
+    so peak memory depends on the chunk size and number of workers, not on the
+    length of the video.
+
+    With `persistent=True` the pool outlives a call and is shared by every thread
+    transcribing through this instance, so a server loads Whisper into its workers
+    once instead of once per video; `close` shuts it down.
+    """
+
+    def __init__(
+        self,
+        model: str = "base",
+        chunk_seconds: float = 30.0,
+        overlap_seconds: float = 2.0,
+        split_on_silence: bool = True,
+        workers: int = 2,
+        persistent: bool = False
+    ):
+        self.model = model
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.split_on_silence = split_on_silence
+        self.workers = workers
+        self.persistent = persistent
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # Spawned, not forked: the pool is started from a thread while frame writers and
+        # the embedder run, and a forked child could inherit their held locks.
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model,)
+        )
+
+    def start(self):
+        """
+        Start the persistent pool and load Whisper into its workers ahead of the first call.
+        """
+        if self.workers <= 1:
+            _init_worker(self.model)
+            return
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+        list(self._pool.map(_init_worker, [self.model] * self.workers))
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def transcribe(self, audio_path: str, on_chunk: Callable[[List[dict], float], None] = None) -> List[dict]:
+        """
+        Parameters:
+        audio_path (str): The path to a WAV file.
+        on_chunk (callable): Called in order with the segments of every transcribed
+        chunk and the time (in seconds) the audio is transcribed up to.
+
+        Returns:
+        list: Ordered segments as {"start": float, "end": float, "text": str}.
+        """
+        chunks = plan_chunks(audio_path, self.chunk_seconds, split_on_silence=self.split_on_silence)
+        tasks = [
+            (audio_path, start, end, self.overlap_seconds, idx == len(chunks) - 1)
+            for idx, (start, end) in enumerate(chunks)
+        ]
+        logger.info(f"Transcribing {len(tasks)} audio chunks with {self.workers} workers")
+
+        def collect(results) -> List[dict]:
+            segments = []
+            for (_, _, end, _, _), chunk in zip(tasks, results):
+                segments.extend(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk, end)
+            return segments
+
+        if self.workers <= 1:
+            with _model_lock:
+                _init_worker(self.model)
+                return collect(_transcribe_chunk(task) for task in tasks)
+
+        if self.persistent:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = self._create_pool()
+                pool = self._pool
+            return collect(pool.map(_transcribe_chunk, tasks))
+
+        with self._create_pool() as pool:
+            return collect(pool.map(_transcribe_chunk, tasks))
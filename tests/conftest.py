@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def frames_folder(tmp_path):
+    """
+    A video folder with two solid-colour frames one second apart, as written by
+    `VideoProcessor.video_to_images`, and their timestamps.
+    """
+    timestamps = {}
+    for index, colour in enumerate(((220, 30, 30), (30, 30, 220))):
+        name = f"frame_{index:05d}.png"
+        Image.fromarray(np.full((32, 48, 3), colour, dtype=np.uint8)).save(tmp_path / name)
+        timestamps[name] = {"filename": os.path.join(str(tmp_path), name), "timestamp": float(index)}
+    return str(tmp_path), timestamps
+
+
+@pytest.fixture
+def stub_config(tmp_path):
+    """
+    Build a `Config` for offline tests: stub embeddings, a private LanceDB and no
+    embedding cache.
+    """
+    pytest.importorskip("llama_index.core")
+    pytest.importorskip("lancedb")
+    from benchmarks.stubs import StubEmbedding
+    from processors.config import Config
+
+    def build(**kwargs):
+        embed_model = StubEmbedding()
+        options = dict(
+            output_folder=str(tmp_path),
+            lancedb_uri=str(tmp_path / "lancedb"),
+            text_embed_model=embed_model,
+            image_embed_model=embed_model,
+            embedding_cache_dir=None,
+        )
+        options.update(kwargs)
+        return Config(**options)
+
+    return build
@@ -0,0 +1,33 @@
+from processors.answer_cache import AnswerCache
+from processors.context import ContextBuilder
+
+
+class WordCounter:
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    cache = AnswerCache()
+    cache.put("video", "What is shown first?", "A red frame.")
+    assert cache.get("video", "what is shown first") == "A red frame."
+    assert cache.get("other video", "what is shown first") is None
+
+
+def test_follow_ups_are_cached_per_history():
+    builder = ContextBuilder(WordCounter())
+    cache = AnswerCache()
+    first = builder.history_key()
+    builder.record("What is shown first?", "A red frame.")
+    after_red = builder.history_key()
+    assert first == "" and after_red
+
+    cache.put("video", "And then?", "A blue frame.", after_red)
+    assert cache.get("video", "And then?", after_red) == "A blue frame."
+    assert cache.get("video", "And then?") is None
+
+    builder.reset()
+    builder.record("What is shown first?", "A red frame.")
+    assert builder.history_key() == after_red
+    cache.invalidate("video")
+    assert cache.get("video", "And then?", after_red) is None
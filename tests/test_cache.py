@@ -0,0 +1,24 @@
+import os
+
+from processors.cache import IngestionCache
+
+
+def fill(cache: IngestionCache, video_id: str, size: int) -> str:
+    entry, manifest = cache.open(video_id, {})
+    with open(os.path.join(entry, "frames.bin"), "wb") as file:
+        file.write(b"\0" * size)
+    return entry
+
+
+def test_pinned_entries_are_not_evicted(tmp_path):
+    cache = IngestionCache(str(tmp_path), max_bytes=1500)
+    first = fill(cache, "first", 1000)
+    second = fill(cache, "second", 1000)
+    # Both are still open, so the cache may go over budget.
+    cache.evict()
+    assert os.path.isdir(first) and os.path.isdir(second)
+
+    cache.unpin(first)
+    cache.evict()
+    assert not os.path.isdir(first) and os.path.isdir(second)
+    cache.unpin(second)
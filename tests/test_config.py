@@ -0,0 +1,14 @@
+import pytest
+
+from processors.cache import IngestionCache
+from processors.config import Config
+
+
+@pytest.mark.parametrize("option, value", [
+    ("asr_chunk_seconds", 45.0),
+    ("asr_overlap_seconds", 0.5),
+    ("asr_split_on_silence", False),
+])
+def test_transcription_settings_change_the_cache_key(option, value):
+    default = IngestionCache.key("video", Config(output_folder="out").pipeline_params())
+    assert IngestionCache.key("video", Config(output_folder="out", **{option: value}).pipeline_params()) != default
@@ -0,0 +1,64 @@
+from processors.context import ContextBuilder
+from processors.retriever.results import ImageHit, RetrievalResult, TextHit
+
+
+class WordCounter:
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def render(context: str, history: str) -> str:
+    return f"prompt {context} {history}"
+
+
+def hit(text: str, start: float) -> TextHit:
+    return TextHit(text=text, start=start, end=start + 10)
+
+
+def test_fits_the_budget_and_keeps_the_best_hits():
+    builder = ContextBuilder(WordCounter(), budget=20, image_tokens=5)
+    result = RetrievalResult(
+        texts=[hit("one two three four five six", 30), hit("seven eight nine ten eleven twelve", 0)],
+        images=[ImageHit(image_path="a.png", document=None), ImageHit(image_path="b.png", document=None)],
+    )
+    packed = builder.build("q", result, render)
+    assert packed.tokens <= 20
+    assert [text.start for text in packed.texts] == [30.0]
+    assert [image.image_path for image in packed.images] == ["a.png"]
+    assert packed.dropped == 2
+
+
+def test_texts_are_deduplicated_and_chronological():
+    builder = ContextBuilder(WordCounter(), budget=1000)
+    result = RetrievalResult(texts=[hit("later", 60), hit("earlier", 0), hit("later", 60)])
+    packed = builder.build("q", result, render)
+    assert [text.text for text in packed.texts] == ["earlier", "later"]
+
+
+def test_history_is_remembered_up_to_max_turns():
+    builder = ContextBuilder(WordCounter(), budget=1000, max_turns=2)
+    for turn in range(3):
+        builder.record(f"question {turn}", f"answer {turn}")
+    packed = builder.build("q", RetrievalResult(), render)
+    assert [turn.query for turn in packed.history] == ["question 1", "question 2"]
+    builder.reset()
+    assert builder.build("q", RetrievalResult(), render).history == []
+
+
+def test_windows_from_earlier_turns_are_packed_after_new_ones():
+    builder = ContextBuilder(WordCounter(), budget=1000)
+    first = builder.build("q1", RetrievalResult(texts=[hit("alpha beta gamma", 0), TextHit("untimed")]), render)
+    builder.record("q1", "a1", first)
+
+    result = RetrievalResult(texts=[hit("alpha beta gamma", 0), TextHit("untimed"), hit("delta epsilon", 30)])
+    packed = builder.build("q2", result, render)
+    # The history does not carry the transcript, so repeated windows are packed again.
+    assert [text.text for text in packed.texts] == ["alpha beta gamma", "delta epsilon", "untimed"]
+    assert "alpha beta gamma" in packed.prompt
+
+    # With room for one window, the new one wins over those already shown and the
+    # history is kept: prompt (1) + new window (5 + 1) + turn (4 + 1) tokens.
+    builder.budget = 12
+    tight = builder.build("q2", result, render)
+    assert [text.text for text in tight.texts] == ["delta epsilon"]
+    assert [turn.query for turn in tight.history] == ["q1"]
@@ -0,0 +1,61 @@
+import numpy as np
+
+from processors.retriever.embedding_cache import EmbeddingCache
+
+
+def test_put_and_get(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model/a")
+    key = EmbeddingCache.content_key(b"frame")
+    assert cache.get(key) is None
+    cache.put_many([key, "other"], [[1.0, 2.0], [3.0, 4.0]])
+    assert np.allclose(cache.get(key), [1.0, 2.0])
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_entries_persist_across_instances(tmp_path):
+    EmbeddingCache(str(tmp_path), "m").put_many(["a"], [[1.0, 0.0]])
+    EmbeddingCache(str(tmp_path), "m").put_many(["b"], [[0.0, 1.0]])
+    cache = EmbeddingCache(str(tmp_path), "m")
+    assert np.allclose(cache.get("a"), [1.0, 0.0])
+    assert np.allclose(cache.get("b"), [0.0, 1.0])
+
+
+def test_vector_rows_without_keys_are_dropped(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many(["a"], [[1.0, 2.0]])
+    # A crash between appending vectors and keys leaves an orphan row.
+    with open(cache.vectors_path, "ab") as file:
+        file.write(np.asarray([[9.0, 9.0]], dtype=np.float32).tobytes())
+    reopened = EmbeddingCache(str(tmp_path), "m")
+    reopened.put_many(["b"], [[3.0, 4.0]])
+    assert np.allclose(reopened.get("b"), [3.0, 4.0])
+
+
+def _append_from_process(args):
+    root, worker = args
+    cache = EmbeddingCache(root, "m")
+    for batch in range(20):
+        keys = [f"{worker}-{batch}-{row}" for row in range(5)]
+        cache.put_many(keys, [[float(worker), float(batch * 5 + row)] for row in range(5)])
+
+
+def test_concurrent_processes_keep_keys_and_rows_aligned(tmp_path):
+    import multiprocessing
+
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        pool.map(_append_from_process, [(str(tmp_path), worker) for worker in range(4)])
+
+    cache = EmbeddingCache(str(tmp_path), "m")
+    assert len(cache.rows) == 4 * 20 * 5
+    for worker in range(4):
+        for batch in range(20):
+            for row in range(5):
+                assert np.allclose(cache.get(f"{worker}-{batch}-{row}"), [worker, batch * 5 + row])
+
+
+def test_instances_see_rows_appended_by_others(tmp_path):
+    first, second = EmbeddingCache(str(tmp_path), "m"), EmbeddingCache(str(tmp_path), "m")
+    first.put_many(["a"], [[1.0, 0.0]])
+    second.put_many(["b"], [[0.0, 1.0]])
+    assert np.allclose(second.get("a"), [1.0, 0.0])
+    assert np.allclose(second.get("b"), [0.0, 1.0])
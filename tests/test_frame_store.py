@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from processors.video.frame_store import (
+    FrameStore,
+    FrameStoreWriter,
+    frame_content,
+    frame_file,
+    frame_version,
+    materialize_frame,
+    open_frame,
+    open_store,
+)
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((60, 100, 3), value, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("encoding", ["raw", "compressed"])
+def test_round_trip(tmp_path, encoding):
+    folder = str(tmp_path)
+    with FrameStoreWriter(folder, encoding=encoding, image_format="png", max_side=50, workers=2) as writer:
+        paths = [writer.submit(index, frame(index * 40)) for index in range(4)]
+
+    assert sorted(os.listdir(folder)) == ["frames.pack", "frames.pack.idx"]
+    store = open_store(folder)
+    assert store.names() == [os.path.basename(path) for path in paths]
+    assert store.array("frame_00002.png").shape == (30, 50, 3)
+    assert int(store.array("frame_00002.png")[0, 0, 0]) == 80
+    with open_frame(paths[3]) as image:
+        assert image.size == (50, 30)
+    assert frame_content(paths[0])
+
+
+def test_raw_frames_are_views_of_the_mapping(tmp_path):
+    with FrameStoreWriter(str(tmp_path), encoding="raw", workers=1) as writer:
+        writer.submit(0, frame(7))
+    array = FrameStore(str(tmp_path)).array("frame_00000.png")
+    assert not array.flags.owndata and not array.flags.writeable
+
+
+def test_frames_are_readable_while_writing(tmp_path):
+    folder = str(tmp_path)
+    visible = []
+
+    def on_written(path):
+        visible.append(os.path.basename(path) in FrameStore(folder))
+
+    with FrameStoreWriter(folder, encoding="raw", workers=1, on_written=on_written) as writer:
+        writer.submit(0, frame(1))
+        writer.submit(1, frame(2))
+    assert visible == [True, True]
+
+
+def test_materialize_only_on_demand(tmp_path):
+    folder = str(tmp_path)
+    with FrameStoreWriter(folder, encoding="compressed", image_format="jpeg", workers=1) as writer:
+        path = writer.submit(0, frame(100))
+    assert not os.path.exists(path)
+    assert materialize_frame(path) == path
+    assert os.path.exists(path)
+    with open_frame(path) as image:
+        assert image.format == "JPEG"
+
+
+def test_frame_version_changes_when_the_pack_is_rewritten(tmp_path):
+    folder = str(tmp_path)
+    path = os.path.join(folder, "frame_00000.png")
+    versions = []
+    for value in (10, 200):
+        with FrameStoreWriter(folder, encoding="raw", workers=1) as writer:
+            writer.submit(0, frame(value))
+        versions.append(frame_version(path))
+    assert versions[0][1] == versions[1][1] == open_store(folder).record("frame_00000.png")["offset"]
+    assert versions[0] != versions[1]
+
+
+@pytest.mark.parametrize("encoding", ["raw", "compressed"])
+def test_frame_file_is_an_image_without_touching_the_disk(tmp_path, encoding):
+    folder = str(tmp_path)
+    with FrameStoreWriter(folder, encoding=encoding, image_format="png", workers=1) as writer:
+        path = writer.submit(0, frame(50))
+    with Image.open(frame_file(path)) as image:
+        assert image.format == "PNG" and image.size == (100, 60)
+    assert sorted(os.listdir(folder)) == ["frames.pack", "frames.pack.idx"]
+
+
+def test_a_new_pack_replaces_materialized_frames(tmp_path):
+    folder = str(tmp_path)
+    path = os.path.join(folder, "frame_00000.png")
+    with FrameStoreWriter(folder, encoding="raw", workers=1) as writer:
+        writer.submit(0, frame(10))
+    materialize_frame(path)
+
+    with FrameStoreWriter(folder, encoding="raw", workers=1) as writer:
+        writer.submit(0, frame(200))
+    assert not os.path.exists(path)
+    # Even a stale copy left next to the pack is not read instead of it.
+    Image.fromarray(frame(10)).save(path)
+    with open_frame(path) as image:
+        assert image.getpixel((0, 0)) == (200, 200, 200)
+
+
+def test_embedders_without_batching_read_stored_frames_in_memory(tmp_path):
+    pytest.importorskip("llama_index.core")
+    from benchmarks.stubs import StubEmbedding
+    from processors.retriever.embedding import BatchImageEmbedder
+
+    folder = str(tmp_path)
+    with FrameStoreWriter(folder, encoding="raw", workers=1) as writer:
+        paths = [writer.submit(index, frame(index * 60)) for index in range(3)]
+    embedder = BatchImageEmbedder(StubEmbedding(), batch_size=2)
+    assert not embedder.supports_batching
+    assert len(embedder.embed(paths)) == 3
+    assert sorted(os.listdir(folder)) == ["frames.pack", "frames.pack.idx"]
@@ -0,0 +1,66 @@
+import pytest
+
+from processors.ingest import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_add_ignores_duplicates(queue):
+    assert queue.add(["a", "b"]) == 2
+    assert queue.add(["b", "c"]) == 1
+    assert queue.counts() == {"pending": 3}
+
+
+def test_claim_hands_out_jobs_in_order_once(queue):
+    queue.add(["a", "b"])
+    first, second = queue.claim("w1"), queue.claim("w2")
+    assert (first["url"], second["url"]) == ("a", "b")
+    assert first["attempts"] == 1 and first["status"] == "running"
+    assert queue.claim("w3") is None
+
+
+def test_failed_jobs_are_retried_until_max_attempts(queue):
+    queue.add(["a"])
+    queue.fail(queue.claim("w")["id"], "w", "boom")
+    assert queue.counts() == {"pending": 1}
+    queue.fail(queue.claim("w")["id"], "w", "boom again")
+    assert queue.counts() == {"failed": 1}
+    assert queue.claim("w") is None
+    assert queue.retry_failed() == 1
+    assert queue.claim("w")["attempts"] == 1
+
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0, max_attempts=2)
+    queue.add(["a"])
+    queue.claim("crashed")
+    job = queue.claim("w")
+    assert job["url"] == "a" and job["attempts"] == 2
+    # The second worker dies too: out of attempts, the job is failed, not handed out.
+    assert queue.claim("w") is None
+    assert queue.jobs("failed")[0]["error"] == "lease expired"
+    queue.close()
+
+
+def test_complete_records_namespace(queue):
+    queue.add(["a"])
+    queue.complete(queue.claim("w")["id"], "w", namespace="ns")
+    assert queue.jobs("done")[0]["namespace"] == "ns"
+    assert not queue.pending()
+
+
+def test_only_the_current_holder_can_finish_a_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0, max_attempts=3)
+    queue.add(["a"])
+    job_id = queue.claim("stale")["id"]
+    queue.claim("current")
+    assert not queue.fail(job_id, "stale", "late error")
+    assert not queue.complete(job_id, "stale", namespace="late")
+    assert queue.jobs("running")[0]["worker"] == "current"
+    assert queue.complete(job_id, "current", namespace="ns")
+    queue.close()
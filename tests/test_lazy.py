@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import types
+
+import pytest
+
+from processors._lazy import lazy_module
+
+
+def test_lazy_names_are_imported_once_and_listed(monkeypatch):
+    package = types.ModuleType("lazy_package")
+    monkeypatch.setitem(sys.modules, "lazy_package", package)
+    package.__getattr__, package.__dir__ = lazy_module("lazy_package", {"OrderedDict": "collections"})
+
+    assert "OrderedDict" in package.__dir__()
+    assert "OrderedDict" not in vars(package)
+    assert package.__getattr__("OrderedDict") is sys.modules["collections"].OrderedDict
+    assert "OrderedDict" in vars(package)
+    with pytest.raises(AttributeError):
+        package.__getattr__("Missing")
+
+
+@pytest.mark.parametrize("module", ["processors.processor", "processors.serving"])
+def test_entry_modules_do_not_import_the_model_stack(module):
+    # A fresh interpreter, since the other tests have already imported everything.
+    heavy = ["llama_index.core", "lancedb", "processors.retriever.processor", "processors.video.processor"]
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*[name for name in {heavy!r} if name in sys.modules])"],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert loaded == []
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from processors.retriever.lexical import BM25Index, phrase_query, tokenize
+
+
+def nodes(*texts):
+    return [SimpleNamespace(text=text) for text in texts]
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("Hello, World! GPT-4o") == ["hello", "world", "gpt", "4o"]
+
+
+def test_phrase_query_only_for_quoted_queries():
+    assert phrase_query('"gradient descent"') == "gradient descent"
+    assert phrase_query("gradient descent") == ""
+    assert phrase_query('""') == ""
+
+
+def test_search_ranks_rare_terms_first():
+    index = BM25Index(nodes("the cat sat", "the dog sat", "a quokka smiled at the cat"))
+    ranked = [node.text for node, _ in index.search("quokka cat")]
+    assert ranked[0] == "a quokka smiled at the cat"
+    assert "the dog sat" not in ranked
+
+
+def test_search_respects_top_k_and_empty_index():
+    index = BM25Index(nodes("alpha beta", "alpha gamma", "alpha delta"))
+    assert len(index.search("alpha", top_k=2)) == 2
+    assert BM25Index().search("alpha") == []
+    assert len(BM25Index()) == 0
+
+
+def test_phrase_search_requires_the_exact_phrase():
+    index = BM25Index(nodes("stochastic gradient descent works", "descent of the gradient", "gradient, descent!"))
+    matched = [node.text for node, _ in index.phrase_search("Gradient Descent")]
+    assert sorted(matched) == ["gradient, descent!", "stochastic gradient descent works"]
+
+
+def test_adding_nodes_scores_like_building_at_once():
+    texts = ("the cat sat", "the dog sat", "a quokka smiled at the cat", "cats and dogs")
+    built = BM25Index(nodes(*texts))
+    added = BM25Index(nodes(*texts[:1])).add(nodes(*texts[1:3])).add(nodes(*texts[3:]))
+    assert added.search("the cat") == built.search("the cat")
+    assert added.avg_length == built.avg_length
@@ -0,0 +1,20 @@
+from processors.registry import ModelRegistry
+
+
+def test_sessions_share_the_transcriber_and_answer_cache(stub_config):
+    registry = ModelRegistry()
+    first, second = stub_config(answer_cache=True), stub_config(answer_cache=True)
+    assert registry.transcriber(first) is registry.transcriber(second)
+    assert registry.transcriber(first).persistent
+    assert registry.answer_cache(first) is registry.answer_cache(second)
+    assert registry.transcriber(stub_config(asr_model="small")) is not registry.transcriber(first)
+
+
+def test_vector_stores_use_the_registry_connection(stub_config):
+    from processors.retriever import Retriever
+
+    registry = ModelRegistry()
+    config = stub_config()
+    retriever = Retriever(config, registry=registry)
+    assert retriever.db is registry.lancedb(config.lancedb_uri)
+    assert retriever._vector_store("text_collection")._connection is retriever.db
@@ -0,0 +1,164 @@
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core.schema import TextNode
+
+from processors.retriever import Retriever
+from processors.retriever.results import ImageHit, RetrievalResult, TextHit
+from processors.retriever.time_index import TimeIndex
+
+
+def node(node_id: str, start: float) -> TextNode:
+    return TextNode(id_=node_id, text=node_id, metadata={"start": start, "end": start + 30})
+
+
+def test_rrf_prefers_windows_found_by_both_searches(stub_config):
+    retriever = Retriever(stub_config(similarity_top_k=2, rrf_k=60))
+    a, b, c = node("a", 0), node("b", 30), node("c", 60)
+    fused = retriever._fuse([(a, 0.9), (b, 0.8)], [(c, 12.0), (b, 3.0)])
+    assert [hit.text for hit in fused] == ["b", "a"]
+    assert fused[0].score == pytest.approx(1 / 62 + 1 / 62)
+
+
+def test_expand_merges_overlapping_windows(stub_config):
+    retriever = Retriever(stub_config())
+    retriever.time_index = TimeIndex.build(
+        {
+            "frame_00000.png": {"filename": "/v/frame_00000.png", "timestamp": 0.0},
+            "frame_00001.png": {"filename": "/v/frame_00001.png", "timestamp": 20.0},
+            "frame_00002.png": {"filename": "/v/frame_00002.png", "timestamp": 100.0},
+        },
+        [
+            {"start": 0.0, "end": 8.0, "text": "intro"},
+            {"start": 8.0, "end": 16.0, "text": "middle"},
+            {"start": 16.0, "end": 30.0, "text": "outro"},
+            {"start": 90.0, "end": 95.0, "text": "far away"},
+        ],
+    )
+    result = RetrievalResult(
+        texts=[TextHit(text="middle", score=0.5, start=8.0, end=16.0), TextHit(text="no time")],
+        images=[ImageHit(image_path="/v/frame_00000.png", document=None, timestamp=0.0)],
+    )
+    expanded = retriever.expand(result, seconds=5.0, frames_per_hit=1)
+
+    # [3, 21] and [-5, 5] overlap, so they become one passage.
+    assert [hit.text for hit in expanded.texts] == ["intro middle outro", "no time"]
+    assert (expanded.texts[0].start, expanded.texts[0].end) == (0.0, 30.0)
+    assert [image.image_path for image in expanded.images] == ["/v/frame_00000.png", "/v/frame_00001.png"]
+
+
+def test_expand_keeps_the_best_score_of_merged_windows(stub_config):
+    retriever = Retriever(stub_config())
+    retriever.time_index = TimeIndex.build({}, [{"start": 0.0, "end": 30.0, "text": "all of it"}])
+    result = RetrievalResult(
+        texts=[TextHit(text="a", score=0.3, start=0.0, end=5.0), TextHit(text="b", score=0.7, start=8.0, end=12.0)],
+        images=[ImageHit(image_path="/v/frame.png", document=None, timestamp=20.0)],
+    )
+    expanded = retriever.expand(result, seconds=5.0, frames_per_hit=0)
+    assert [(hit.text, hit.score) for hit in expanded.texts] == [("all of it", 0.7)]
+
+
+def test_expand_without_time_index_is_a_no_op(stub_config):
+    retriever = Retriever(stub_config())
+    result = RetrievalResult(texts=[TextHit(text="x", start=0.0, end=1.0)])
+    assert retriever.expand(result, seconds=10.0) is result
+
+
+def test_vector_text_hits_are_capped_without_lexical_index(stub_config):
+    from llama_index.core.schema import NodeWithScore
+
+    retriever = Retriever(stub_config(similarity_top_k=2, lexical_top_k=10, context_window_seconds=0))
+    candidates = [NodeWithScore(node=node(f"n{idx}", idx * 30.0), score=1.0 - idx / 10) for idx in range(10)]
+    retriever.retriever_engine = type("Engine", (), {"retrieve": lambda self, query: candidates})()
+    assert [hit.text for hit in retriever.retrieve("anything").texts] == ["n0", "n1"]
+
+
+SEGMENTS = [{"start": 0.0, "end": 2.0, "text": "red apples"}, {"start": 40.0, "end": 42.0, "text": "green pears"}]
+
+
+def test_indexed_frames_and_segments_are_both_retrieved(stub_config, frames_folder):
+    from processors.retriever.transcript import save_segments
+
+    folder, timestamps = frames_folder
+    save_segments(SEGMENTS, folder)
+    retriever = Retriever(stub_config(similarity_top_k=2, hybrid_search=False))
+    retriever.index_data(folder, namespace="video", timestamps=timestamps)
+
+    result = retriever.retrieve("red apples")
+    assert sorted(hit.text for hit in result.texts) == ["green pears", "red apples"]
+    assert sorted(hit.image_path for hit in result.images) == sorted(
+        entry["filename"] for entry in timestamps.values()
+    )
+
+
+def test_progressive_inserts_of_one_kind_keep_the_other_searchable(stub_config, frames_folder):
+    folder, timestamps = frames_folder
+    retriever = Retriever(stub_config(similarity_top_k=2, hybrid_search=False))
+    retriever.begin_index("video")
+    retriever.insert_frames([entry["filename"] for entry in timestamps.values()], timestamps)
+    retriever.insert_segments(SEGMENTS, covered_until=60.0)
+    retriever.insert_frames([], timestamps)
+
+    result = retriever.retrieve("red apples")
+    assert result.texts and len(result.images) == 2
+
+
+def test_frames_written_out_of_order_are_all_kept(stub_config, frames_folder):
+    folder, timestamps = frames_folder
+    first, second = [entry["filename"] for entry in timestamps.values()]
+    retriever = Retriever(stub_config(hybrid_search=False))
+    retriever.begin_index("video")
+
+    retriever.insert_frames([second], timestamps)
+    # The first second of the video is not indexed yet, so nothing is covered.
+    assert retriever.watermark.frame_seconds == 0.0 and retriever.watermark.frames == 1
+    retriever.insert_frames([first], timestamps)
+    assert retriever.watermark.frame_seconds == 1.0
+    assert retriever._open_table("image_video").count_rows() == 2
+
+
+def test_keyframes_are_indexed_once_their_range_is_final(stub_config, frames_folder):
+    folder, timestamps = frames_folder
+    first, second = [entry["filename"] for entry in timestamps.values()]
+    retriever = Retriever(stub_config(hybrid_search=False))
+    retriever.begin_index("video")
+
+    growing = {}
+    growing["frame_00000.png"] = dict(timestamps["frame_00000.png"], start=0.0, end=0.5)
+    retriever.insert_frames([first], growing)
+    assert not retriever.watermark.queryable
+    # Dropped frames extend the keyframe, then the next keyframe closes its range.
+    growing["frame_00000.png"]["end"] = 1.0
+    growing["frame_00001.png"] = dict(timestamps["frame_00001.png"], start=1.0, end=1.5)
+    retriever.insert_frames([second], growing)
+    assert retriever.watermark.frames == 1 and retriever.watermark.frame_seconds == 1.0
+    assert [hit.document.metadata["end"] for hit in retriever.retrieve("anything").images] == [1.0]
+
+    retriever.finish_index(folder, timestamps=growing)
+    assert retriever._open_table("image_video").count_rows() == 2
+
+
+def test_namespaces_are_found_among_many_tables(stub_config, frames_folder):
+    folder, timestamps = frames_folder
+    retriever = Retriever(stub_config(similarity_top_k=2, hybrid_search=False))
+    for video in range(12):
+        retriever.index_data(folder, namespace=f"video{video}", timestamps=timestamps)
+
+    # Frames only: the videos have no speech, so their text tables never exist.
+    assert all(retriever.has_namespace(f"video{video}") for video in range(12))
+    assert not retriever.has_namespace("unknown")
+
+    retriever.load_index("video0", output_folder=folder)
+    assert len(retriever.retrieve("anything").images) == 2
+
+    retriever.drop_namespace("video0")
+    assert not retriever.has_namespace("video0")
+
+
+def test_embedding_caches_are_named_by_model_id(stub_config, tmp_path):
+    from processors.config import model_id
+
+    retriever = Retriever(stub_config(embedding_cache_dir=str(tmp_path / "embeddings")))
+    model = retriever.text_embed_model
+    assert retriever.embedding_cache(model).model_name == model_id(model)
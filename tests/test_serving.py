@@ -0,0 +1,61 @@
+import os
+import sys
+
+
+class FakeVideoProcessor:
+    timestamps = {}
+
+    def resolve_video_id(self, url: str) -> str:
+        return url
+
+    def __call__(self, **kwargs):
+        pass
+
+
+def build_bot(config, folder: str):
+    from processors.processor import ConversationBot
+    from processors.retriever import Retriever
+
+    os.makedirs(folder)
+    bot = ConversationBot(
+        config=config,
+        video_processor=FakeVideoProcessor(),
+        retriever_processor=Retriever(config),
+        database_path=folder,
+        llm=None
+    )
+    bot.scratch_folder = folder
+    return bot
+
+
+def test_uncached_bots_on_the_same_video_keep_their_tables_apart(stub_config, frames_folder, tmp_path, monkeypatch):
+    config = stub_config(cache_dir=None, progressive_indexing=False, hybrid_search=False)
+    with monkeypatch.context() as patch:
+        # The bots' token counters would download a tiktoken encoding otherwise.
+        patch.setitem(sys.modules, "tiktoken", None)
+        first, second = build_bot(config, str(tmp_path / "first")), build_bot(config, str(tmp_path / "second"))
+    folder, timestamps = frames_folder
+    for bot in (first, second):
+        bot.read_video("same-video")
+        bot.retriever_processor.index_data(folder, namespace=bot.namespace, timestamps=timestamps)
+    assert first.namespace != second.namespace
+
+    second.close()
+    assert not os.path.exists(tmp_path / "second")
+    assert not first.retriever_processor.has_namespace(second.namespace)
+    assert first.retriever_processor.has_namespace(first.namespace)
+    assert first.retriever_processor.retrieve("red").images
+
+    first.close()
+    assert not os.path.exists(tmp_path / "first")
+    assert not second.retriever_processor.has_namespace(first.namespace)
+
+
+def test_video_locks_are_released(stub_config):
+    from processors.registry import ModelRegistry
+    from processors.serving import SessionManager
+
+    manager = SessionManager(ModelRegistry())
+    with manager._video_lock("a"), manager._video_lock("b"):
+        assert set(manager._video_locks) == {"a", "b"}
+    assert manager._video_locks == {}
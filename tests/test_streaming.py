@@ -0,0 +1,87 @@
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("llama_index.multi_modal_llms.openai")
+
+from processors.llms import GPT4o
+
+ANSWER = ["The ", "red ", "frame ", "comes first."]
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-compatible endpoint: every chat completion streams `ANSWER`.
+    """
+
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for token in ANSWER + [None]:
+            chunk = {
+                "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": token} if token else {},
+                    "finish_reason": None if token else "stop",
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def openai_api_base():
+    FakeOpenAI.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+async def collect(stream) -> list:
+    return [token async for token in stream]
+
+
+def test_agenerate_streams_deltas(stub_config, openai_api_base):
+    llm = GPT4o(stub_config(openai_api_key="test", openai_api_base=openai_api_base))
+    assert asyncio.run(collect(llm.agenerate("Which frame comes first?", images=[]))) == ANSWER
+    assert FakeOpenAI.requests[0]["stream"] is True
+
+
+def test_achat_streams_an_answer_with_the_retrieved_frames(stub_config, frames_folder, openai_api_base, monkeypatch):
+    # tiktoken downloads its encodings on first use; estimate token counts offline.
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    from processors.processor import ConversationBot
+    from processors.retriever import Retriever
+    from processors.video import VideoProcessor
+
+    folder, timestamps = frames_folder
+    config = stub_config(openai_api_key="test", openai_api_base=openai_api_base, hybrid_search=False)
+    retriever = Retriever(config)
+    retriever.index_data(folder, namespace="video", timestamps=timestamps)
+    bot = ConversationBot(
+        config=config,
+        video_processor=VideoProcessor(config=config),
+        retriever_processor=retriever,
+        database_path=folder,
+        llm=GPT4o(config)
+    )
+
+    assert asyncio.run(collect(bot.achat("Which frame comes first?"))) == ANSWER
+    content = FakeOpenAI.requests[0]["messages"][-1]["content"]
+    assert sum(part["type"] == "image_url" for part in content) == 2
+    assert [turn.answer for turn in bot.context_builder.turns] == ["".join(ANSWER)]
@@ -0,0 +1,45 @@
+import numpy as np
+
+from processors.retriever.time_index import TimeIndex
+
+TIMESTAMPS = {
+    "frame_00002.png": {"filename": "/v/frame_00002.png", "timestamp": 10.0},
+    "frame_00000.png": {"filename": "/v/frame_00000.png", "timestamp": 0.0},
+    "frame_00001.png": {"filename": "/v/frame_00001.png", "timestamp": 5.0},
+}
+SEGMENTS = [
+    {"start": 0.0, "end": 4.0, "text": "one"},
+    {"start": 3.0, "end": 12.0, "text": "two"},
+    {"start": 4.0, "end": 6.0, "text": "three"},
+    {"start": 13.0, "end": 15.0, "text": "four"},
+]
+
+
+def test_frames_between_is_inclusive_and_sorted():
+    index = TimeIndex.build(TIMESTAMPS, SEGMENTS)
+    assert index.frames_between(0.0, 5.0) == [(0.0, "/v/frame_00000.png"), (5.0, "/v/frame_00001.png")]
+    assert index.frames_between(5.5, 9.0) == []
+
+
+def test_segments_between_finds_long_overlapping_segments():
+    index = TimeIndex.build(TIMESTAMPS, SEGMENTS)
+    # "two" starts before the range but is still being spoken.
+    assert [segment["text"] for segment in index.segments_between(7.0, 8.0)] == ["two"]
+    assert [segment["text"] for segment in index.segments_between(5.0, 14.0)] == ["two", "three", "four"]
+    assert index.segments_between(16.0, 20.0) == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = TimeIndex.build(TIMESTAMPS, SEGMENTS)
+    index.save(str(tmp_path))
+    loaded = TimeIndex.load(str(tmp_path))
+    assert np.array_equal(loaded.frame_times, index.frame_times)
+    assert loaded.segments_between(0.0, 20.0) == index.segments_between(0.0, 20.0)
+    assert loaded.duration == 15.0
+
+
+def test_empty_index():
+    index = TimeIndex.build({}, [])
+    assert index.duration == 0.0
+    assert index.frames_between(0, 10) == []
+    assert index.segments_between(0, 10) == []
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+pytest.importorskip("imageio_ffmpeg")
+
+from benchmarks.synthetic import make_video
+from processors.video import VideoProcessor
+from processors.video.frame_store import open_frame
+
+
+@pytest.mark.parametrize("frame_store", [None, "raw"])
+def test_frames_are_extracted_at_the_configured_rate(stub_config, tmp_path, frame_store):
+    video = make_video(str(tmp_path / "video.mp4"), seconds=4, width=64, height=48)
+    folder = str(tmp_path / "frames")
+    written = []
+    processor = VideoProcessor(config=stub_config(video_fps=1, frame_store=frame_store))
+
+    timestamps = processor.video_to_images(video, folder, on_frame=written.append)
+
+    assert [entry["timestamp"] for entry in timestamps.values()] == [0.0, 1.0, 2.0, 3.0]
+    assert sorted(written) == sorted(entry["filename"] for entry in timestamps.values())
+    assert processor.get_timestamps(written[0]) == timestamps[os.path.basename(written[0])]
+    with open_frame(timestamps["frame_00002.png"]["filename"]) as image:
+        assert image.size == (64, 48)